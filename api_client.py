@@ -0,0 +1,312 @@
+# This file is the layer every call out to Robinhood goes through
+# - a token bucket keeps calls under a steady rate (with room for short bursts), so we don't get throttled
+# - calls that fail for a passing reason (connection dropped, timed out, throttled, server error, or robin_stocks
+#   handing back nothing) are tried again after a short random wait that grows with each try
+# - identical price/account requests made at the same time share a single call instead of each making their own
+# - connections are kept open and reused (a pool) instead of opening a new one per call
+# Orders are never sent twice: an order is only tried again if Robinhood throttled it (so it was never placed).
+# robin_stocks prints and swallows HTTP errors on orders (handing back None), so orders ask it for the raw response
+# instead to see the status code.  No response at all is never taken as throttling: robin_stocks also hands back None
+# when the connection dropped after the order went out, and the order may have been placed.  Other error responses
+# (e.g. not enough buying power) are Robinhood turning the order down for good, so they aren't tried again either.
+#
+# The calls themselves come from an 'api' object: RobinhoodApi uses robin_stocks, HttpApi talks to any server
+# answering the same requests as plain JSON (e.g. a local stand-in server for testing, see HttpApi).
+
+import http.client
+import json
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from time import monotonic, sleep
+from urllib.parse import urlsplit, quote
+import robin_stocks.robinhood as rs
+
+
+# an error response from the API, with the HTTP status (None if unknown) and how long it asked us to wait (if it did)
+class ApiError(Exception):
+
+    def __init__(self, status, message='', retry_after=None):
+        super().__init__(f'{status} {message}'.strip())
+        self.status = status
+        self.retry_after = retry_after
+
+
+# whether a failed call is worth trying again (dropped/refused/timed out connections, throttling, server errors)
+def transient(error):
+    if isinstance(error, ApiError):
+        return error.status == 429 or (error.status is not None and error.status >= 500)
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+# whether an order response says the order was throttled (never placed, safe to send again)
+def throttled(response):
+    return isinstance(response, dict) and 'throttled' in str(response.get('detail', '')).lower()
+
+
+# whether a failed order is safe to send again: only if it was throttled (any other failure may have been placed)
+def order_refused(error):
+    return isinstance(error, ApiError) and error.status == 429
+
+
+# limits calls to 'rate' per second on average, allowing up to 'burst' calls at once after a quiet spell
+# safe to share between threads
+class TokenBucket:
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+        self.lock = threading.Lock()
+
+    # wait until a call is allowed
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens = self.tokens - 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            sleep(wait)
+
+
+# API BACKENDS
+# =================================================================================================================
+# order response from robin_stocks' raw HTTP response (see the notes at the top)
+# returns: the response data, raises ApiError if there was no response or it was throttled (429)
+def order_response(response):
+    if response is None:
+        raise ApiError(None, 'no response to the order, check Robinhood to see whether it was placed')
+    if response.status_code == 429:
+        retry_after = response.headers.get('Retry-After')
+        raise ApiError(429, response.text[:200], float(retry_after) if retry_after else None)
+    try:
+        return response.json()
+    except ValueError:
+        raise ApiError(response.status_code, response.text[:200])
+
+
+# calls through robin_stocks (the real thing)
+class RobinhoodApi:
+
+    def log_in(self, username, password, mfa, session_name, expires_in):
+        return rs.login(username=username, password=password, expiresIn=expires_in, store_session=True,
+                        mfa_code=mfa, pickle_name=session_name)
+
+    def latest_prices(self, symbols):
+        return rs.stocks.get_latest_price(symbols)
+
+    def account_profile(self):
+        return rs.profiles.load_account_profile()
+
+    def buy(self, symbol, quantity):
+        return order_response(rs.orders.order_buy_fractional_by_quantity(symbol, quantity, timeInForce='gfd',
+                                                                         jsonify=False))
+
+    def sell(self, symbol, quantity):
+        return order_response(rs.orders.order_sell_fractional_by_quantity(symbol, quantity, timeInForce='gfd',
+                                                                          jsonify=False))
+
+    def order_info(self, order_id):
+        return rs.orders.get_stock_order_info(order_id)
+
+    def cancel_order(self, order_id):
+        return rs.orders.cancel_stock_order(order_id)
+
+    # let robin_stocks keep up to 'size' connections open at once (its default pool is smaller than the number of
+    # calls the live engine can have going at the same time)
+    def pool(self, size):
+        from requests.adapters import HTTPAdapter
+        rs.helper.SESSION.mount('https://', HTTPAdapter(pool_connections=size, pool_maxsize=size))
+
+
+# calls to a server answering plain JSON at base_url, e.g. a local stand-in for testing:
+#   GET  /quotes?symbols=MSFT,AAPL  ->  ["410.5", "189.2"]
+#   GET  /account                   ->  {"buying_power": "1000.00", ...}
+#   POST /orders  {"symbol": "MSFT", "quantity": 0.5, "side": "buy"}  ->  {"id": "...", "state": "queued", ...}
+#   GET  /orders/<id>               ->  {"state": "filled", "cumulative_quantity": "0.5", "average_price": "410.5"}
+#   POST /orders/<id>/cancel        ->  {}
+# any other status than 200 is raised as an ApiError (a Retry-After header is passed along)
+class HttpApi:
+
+    def __init__(self, base_url, timeout=10):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.secure = parts.scheme == 'https'
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.connections = queue.LifoQueue()
+        self.size = 4
+
+    def pool(self, size):
+        self.size = size
+
+    def connect(self):
+        if self.secure:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    # send a request on a pooled connection (a connection that fails is dropped instead of going back to the pool)
+    def request(self, method, path, body=None):
+        try:
+            connection = self.connections.get_nowait()
+        except queue.Empty:
+            connection = self.connect()
+        try:
+            connection.request(method, self.prefix + path, body=None if body is None else json.dumps(body),
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+        if self.connections.qsize() < self.size:
+            self.connections.put(connection)
+        else:
+            connection.close()
+        if response.status != 200:
+            retry_after = response.getheader('Retry-After')
+            raise ApiError(response.status, data.decode(errors='replace')[:200],
+                           float(retry_after) if retry_after else None)
+        return json.loads(data)
+
+    def latest_prices(self, symbols):
+        return self.request('GET', '/quotes?symbols=' + quote(','.join(symbols)))
+
+    def account_profile(self):
+        return self.request('GET', '/account')
+
+    def buy(self, symbol, quantity):
+        return self.request('POST', '/orders', {'symbol': symbol, 'quantity': quantity, 'side': 'buy'})
+
+    def sell(self, symbol, quantity):
+        return self.request('POST', '/orders', {'symbol': symbol, 'quantity': quantity, 'side': 'sell'})
+
+    def order_info(self, order_id):
+        return self.request('GET', f'/orders/{quote(str(order_id))}')
+
+    def cancel_order(self, order_id):
+        return self.request('POST', f'/orders/{quote(str(order_id))}/cancel', {})
+
+
+# CLIENT
+# =================================================================================================================
+# rate limited, retrying, coalescing client over an api backend (RobinhoodApi by default)
+# provide: api backend, rate and burst (calls per second and burst size for the token bucket), retries (extra tries
+#           after the first), base_delay and max_delay (seconds; the wait before try n is random between 0 and
+#           base_delay * 2^n, capped at max_delay, unless the server says how long to wait) and pool_size
+#           (connections kept open)
+class ApiClient:
+
+    def __init__(self, api=None, rate=5, burst=10, retries=4, base_delay=0.5, max_delay=8, pool_size=8):
+        self.api = api or RobinhoodApi()
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = dict()
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.retried = 0
+        self.coalesced = 0
+        self.api.pool(pool_size)
+
+    # how long to wait before the next try
+    def backoff(self, attempt, error=None):
+        if isinstance(error, ApiError) and error.retry_after is not None:
+            return min(error.retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    # make one call, waiting on the rate limit and trying again as needed
+    # provide: function and its arguments, retry_if (function deciding which errors are tried again; orders only
+    #           retry throttling, since an order may have gone through even if the response was lost), valid
+    #           (function checking the result, an invalid result is tried again) and key (calls with the same key made
+    #           at the same time share one call)
+    def call(self, function, *args, retry_if=transient, valid=None, key=None):
+        if key is not None:
+            return self.shared(key, lambda: self.call(function, *args, retry_if=retry_if, valid=valid))
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.calls = self.calls + 1
+            try:
+                result = function(*args)
+            except Exception as error:
+                if not retry_if(error) or attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt, error)
+            else:
+                if valid is None or valid(result):
+                    return result
+                if attempt >= self.retries:
+                    raise ApiError(None, f'no usable response after {attempt + 1} tries: {result}')
+                delay = self.backoff(attempt)
+            attempt = attempt + 1
+            self.retried = self.retried + 1
+            sleep(delay)
+
+    # run a call, or wait on the same call if another thread already has it going
+    def shared(self, key, run):
+        with self.lock:
+            future = self.in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self.in_flight[key] = future
+            else:
+                self.coalesced = self.coalesced + 1
+        if owner:
+            try:
+                future.set_result(run())
+            except Exception as error:
+                future.set_exception(error)
+            finally:
+                with self.lock:
+                    del self.in_flight[key]
+        return future.result()
+
+    # log in (wrong details aren't tried again, only dropped connections and the like)
+    def log_in(self, username, password, mfa, session_name='', expires_in=86400):
+        return self.call(self.api.log_in, username, password, mfa, session_name, expires_in)
+
+    # latest price for every stock in the list, in a single request
+    def latest_prices(self, symbols):
+        return self.call(self.api.latest_prices, list(symbols), key=('quotes', tuple(symbols)),
+                         valid=lambda prices: prices is not None and len(prices) == len(symbols) and
+                         all(price is not None for price in prices))
+
+    def account_profile(self):
+        return self.call(self.api.account_profile, key=('account',),
+                         valid=lambda profile: isinstance(profile, dict) and 'buying_power' in profile)
+
+    def buy(self, symbol, quantity):
+        return self.call(self.api.buy, symbol, quantity, retry_if=order_refused,
+                         valid=lambda response: not throttled(response))
+
+    def sell(self, symbol, quantity):
+        return self.call(self.api.sell, symbol, quantity, retry_if=order_refused,
+                         valid=lambda response: not throttled(response))
+
+    def order_info(self, order_id):
+        return self.call(self.api.order_info, order_id, valid=lambda info: isinstance(info, dict) and 'state' in info)
+
+    # cancelling twice does no harm, so a cancel is tried again like any other call
+    def cancel_order(self, order_id):
+        return self.call(self.api.cancel_order, order_id)
+
+
+# client shared by everything in this process (so all calls count against the same rate limit)
+shared_client = None
+
+
+def default_client():
+    global shared_client
+    if shared_client is None:
+        shared_client = ApiClient()
+    return shared_client
@@ -0,0 +1,241 @@
+# This file keeps a local on-disk store of historical price bars so repeat analysis doesn't re-download data
+# Bars are saved as one file per ticker, interval and trading day, and read back memory-mapped (no copy on read)
+# Only days that are missing from the store are pulled from the fetcher, everything else is served from disk
+
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from trading_calendar import is_session, session_on_or_after
+
+# folder the bars are stored in, can be overridden with the ROBINHOOD_BOT_CACHE environment variable
+cache_dir = os.environ.get('ROBINHOOD_BOT_CACHE',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bar_cache'))
+
+# exchange timezone, trading days are split on the exchange's calendar date
+market_timezone = 'America/New_York'
+
+# seconds per bar for the supported bar intervals
+interval_seconds = {'1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800}
+
+# longest date range (calendar days) pulled in one request for each interval - yahoo finance turns down longer 1 minute
+# requests (over 8 days) and intraday requests over 60 days, so longer runs of missing days are split up
+# (yahoo also only keeps intraday bars for a while - 30 days of 1 minute bars, 60 days of the others - so older days
+# come back empty however they're requested, and aren't stored)
+max_request_days = {'1m': 7, '2m': 59, '5m': 59, '15m': 59, '30m': 59}
+
+
+# default fetcher, pulls bars from yahoo finance
+# provide: target_stock (ticker e.g. 'MSFT'), interval (e.g. '5m'), start_date and end_date (end date is exclusive)
+# returns: dataframe with 'Open' and 'Close' columns indexed by bar time
+def fetch_yahoo(target_stock, interval, start_date, end_date):
+    return yf.Ticker(target_stock).history(interval=interval, start=start_date, end=end_date)[['Open', 'Close']]
+
+
+# pulls bars for many tickers from yahoo finance in one request
+# provide: list of tickers, interval (e.g. '5m'), start_date and end_date (end date is exclusive)
+# returns: dictionary of ticker -> dataframe with 'Open' and 'Close' columns indexed by bar time
+def fetch_yahoo_bulk(tickers, interval, start_date, end_date):
+    fetched_data = yf.download(list(tickers), interval=interval, start=start_date, end=end_date,
+                               group_by='ticker', threads=True, progress=False)
+    by_ticker = dict()
+    for target_stock in tickers:
+        if target_stock in fetched_data.columns.get_level_values(0):
+            by_ticker[target_stock] = fetched_data[target_stock][['Open', 'Close']].dropna()
+    return by_ticker
+
+
+# fetcher used for days that aren't stored yet; set to None to run fully offline from whatever is on disk
+fetcher = fetch_yahoo
+
+# fetcher used to fill in many tickers at once (see prefetch); None falls back to pulling one ticker at a time
+bulk_fetcher = fetch_yahoo_bulk
+
+
+# swap out the function used to pull missing bars (e.g. a different data vendor, or None to stay offline)
+# provide: new_fetcher - function taking (target_stock, interval, start_date, end_date) and returning a dataframe
+#           with 'Open' and 'Close' columns and a datetime index, or None to never go to the network
+def set_fetcher(new_fetcher):
+    global fetcher
+    fetcher = new_fetcher
+
+
+# swap out the function used to pull missing bars for many tickers at once
+# provide: new_fetcher - function taking (tickers, interval, start_date, end_date) and returning a dictionary of
+#           ticker -> dataframe (same shape as set_fetcher), or None to pull one ticker at a time
+def set_bulk_fetcher(new_fetcher):
+    global bulk_fetcher
+    bulk_fetcher = new_fetcher
+
+
+# point the store at a different folder
+# provide: path - folder to store bars in (created as needed)
+def set_cache_dir(path):
+    global cache_dir
+    cache_dir = path
+
+
+# file a given ticker/interval/day is stored in
+# each file holds a 3 x n float64 array: bar time (seconds since epoch, UTC), open price, close price
+def day_path(target_stock, interval, day):
+    return os.path.join(cache_dir, target_stock.upper(), interval, f'{day.isoformat()}.npy')
+
+
+# load one stored day as a read-only memory-mapped array, rows are time/open/close (see day_path)
+# returns: the mapped array, or None if that day isn't stored yet
+def load_day_arrays(target_stock, interval, day):
+    path = day_path(target_stock, interval, day)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+# write one day to the store, written to a temp file first so parallel runs never read a partial file
+def save_day_arrays(target_stock, interval, day, arrays):
+    path = day_path(target_stock, interval, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as temp_file:
+        np.save(temp_file, np.ascontiguousarray(arrays, dtype=np.float64))
+    os.replace(temp_path, path)
+
+
+# make sure we are working with plain dates (datetime and pandas Timestamp are accepted too)
+def as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+# today's date on the exchange's calendar; days from today onwards aren't finished so they are never stored
+def market_today():
+    return pd.Timestamp.now(tz=market_timezone).date()
+
+
+# split a fetched dataframe into per-day time/open/close arrays keyed by the exchange calendar date
+def split_days(fetched_data):
+    if fetched_data is None or len(fetched_data) == 0:
+        return {}
+    index = pd.DatetimeIndex(fetched_data.index)
+    if index.tz is None:
+        index = index.tz_localize(market_timezone)
+    times = index.tz_convert('UTC').as_unit('s').asi8.astype(np.float64)
+    local_days = index.tz_convert(market_timezone).tz_localize(None).values.astype('datetime64[D]')
+    arrays = np.vstack([times,
+                        fetched_data['Open'].to_numpy(dtype=np.float64),
+                        fetched_data['Close'].to_numpy(dtype=np.float64)])
+    unique_days, starts = np.unique(local_days, return_index=True)
+    ends = list(starts[1:]) + [len(local_days)]
+    return {day.astype(date): arrays[:, start:end] for day, start, end in zip(unique_days, starts, ends)}
+
+
+# group a sorted list of days into runs of consecutive trading days so each run can be pulled in a single request
+# (a weekend or holiday between two missing days doesn't split the run)
+# provide: days and max_days (longest run in calendar days, see max_request_days; None for no limit)
+def contiguous_runs(days, max_days=None):
+    runs = list()
+    for day in days:
+        if runs and session_on_or_after(runs[-1][1] + timedelta(days=1)) >= day and \
+                (max_days is None or (day - runs[-1][0]).days < max_days):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+# pull all missing days in the given list, store the finished ones and return everything that was pulled
+# runs of missing days are pulled one request at a time, at most max_request_days long
+# days the market is closed (weekends and holidays, see trading_calendar.py) never have bars so they are never
+# downloaded
+# a run that comes back completely empty isn't stored (could be a failed download), but empty days inside a
+# run that did return data are stored as empty so weekends/holidays aren't downloaded again
+def fill_missing(target_stock, interval, missing_days):
+    pulled = dict()
+    if fetcher is None:
+        return pulled
+    today = market_today()
+    for run_start, run_end in contiguous_runs([day for day in missing_days if is_session(day)],
+                                              max_request_days.get(interval)):
+        fetched_data = fetcher(target_stock, interval, run_start, run_end + timedelta(days=1))
+        pulled.update(store_run(target_stock, interval, run_start, run_end, fetched_data, today))
+    return pulled
+
+
+# split a fetched run of days and store the finished ones (see fill_missing for what gets stored)
+# provide: only_days (days to store, None for every day in the run) - a run pulled for several tickers together
+#           covers days some of them already have stored, and those must not be overwritten
+# returns: dictionary of day -> time/open/close arrays for every day in the run
+def store_run(target_stock, interval, run_start, run_end, fetched_data, today, only_days=None):
+    pulled = dict()
+    by_day = split_days(fetched_data)
+    day = run_start
+    while day <= run_end:
+        arrays = by_day.get(day, np.empty((3, 0)))
+        pulled[day] = arrays
+        if by_day and day < today and (only_days is None or day in only_days):
+            save_day_arrays(target_stock, interval, day, arrays)
+        day = day + timedelta(days=1)
+    return pulled
+
+
+# make sure every ticker in a list has its bars stored for a date range, pulling the missing days for all of
+# them together (one request per run of missing days) instead of one download per ticker
+# only each ticker's own missing days are stored, days it already has are left as they are
+# later calls to load_arrays/load_bars for these tickers are then served from disk
+# provide: list of tickers, start_date and end_date (end date is exclusive), bar interval
+def prefetch(tickers, start_date, end_date, interval='5m'):
+    if fetcher is None and bulk_fetcher is None:
+        return
+    start_date = as_date(start_date)
+    end_date = as_date(end_date)
+    days = [start_date + timedelta(days=n) for n in range(max((end_date - start_date).days, 0))]
+    days = [day for day in days if is_session(day)]
+    missing = {target_stock: [day for day in days if not os.path.exists(day_path(target_stock, interval, day))]
+               for target_stock in tickers}
+    missing = {target_stock: missing_days for target_stock, missing_days in missing.items() if missing_days}
+    if bulk_fetcher is None:
+        for target_stock, missing_days in missing.items():
+            fill_missing(target_stock, interval, missing_days)
+        return
+
+    today = market_today()
+    all_missing = sorted(set(day for missing_days in missing.values() for day in missing_days))
+    for run_start, run_end in contiguous_runs(all_missing, max_request_days.get(interval)):
+        run_tickers = [target_stock for target_stock, missing_days in missing.items()
+                       if any(run_start <= day <= run_end for day in missing_days)]
+        by_ticker = bulk_fetcher(run_tickers, interval, run_start, run_end + timedelta(days=1))
+        for target_stock in run_tickers:
+            store_run(target_stock, interval, run_start, run_end, by_ticker.get(target_stock), today,
+                      set(missing[target_stock]))
+
+
+# load bars for a ticker over a date range, only going to the fetcher for days that aren't stored yet
+# provide: target_stock (ticker e.g. 'MSFT'), start_date and end_date (end date is exclusive, same as yfinance),
+#           and the bar interval (defaults to 5 minute bars)
+# returns: 3 x n array of bar time (seconds since epoch, UTC), open and close prices
+#           a single stored day is returned as the memory-mapped file itself, longer ranges are joined together
+def load_arrays(target_stock, start_date, end_date, interval='5m'):
+    start_date = as_date(start_date)
+    end_date = as_date(end_date)
+    days = [start_date + timedelta(days=n) for n in range(max((end_date - start_date).days, 0))]
+    pieces = [load_day_arrays(target_stock, interval, day) for day in days]
+    missing_days = [day for day, piece in zip(days, pieces) if piece is None]
+    if missing_days:
+        pulled = fill_missing(target_stock, interval, missing_days)
+        pieces = [pulled.get(day) if piece is None else piece for day, piece in zip(days, pieces)]
+    pieces = [piece for piece in pieces if piece is not None and piece.shape[1] > 0]
+    if len(pieces) == 0:
+        return np.empty((3, 0))
+    if len(pieces) == 1:
+        return pieces[0]
+    return np.concatenate(pieces, axis=1)
+
+
+# load bars for a ticker over a date range as a dataframe, in the same shape yfinance returns them
+# provide: target_stock (ticker e.g. 'MSFT'), start_date and end_date (end date is exclusive), bar interval
+# returns: dataframe with 'Open' and 'Close' columns indexed by bar time in the exchange timezone
+def load_bars(target_stock, start_date, end_date, interval='5m'):
+    arrays = load_arrays(target_stock, start_date, end_date, interval)
+    index = pd.to_datetime(arrays[0].astype(np.int64), unit='s', utc=True).tz_convert(market_timezone)
+    return pd.DataFrame({'Open': arrays[1], 'Close': arrays[2]}, index=index)
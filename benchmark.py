@@ -0,0 +1,237 @@
+# This file times the test/analysis functions on made-up (synthetic) price data so speed can be measured offline
+# Price bars are generated from a fixed random seed, so every run sees exactly the same data and nothing is pulled
+# from yahoo finance.  Each function is timed over several spans of data (one day up to a year of 1 minute bars),
+# results can be saved as a baseline, and later runs flag anything that got noticeably slower.
+#
+# run from the terminal:
+#   python benchmark.py             - time everything and compare to the saved baseline
+#   python benchmark.py --save      - time everything and save the results as the new baseline
+#   python benchmark.py --sizes 1d 1w --repeat 5
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import zlib
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from time import perf_counter
+import numpy as np
+import pandas as pd
+import bar_cache
+import results_cache
+import support_functions
+import testing
+import trade_kernel
+import trading_calendar
+import walk_forward
+
+# spans of data to time each function over, in trading days counting back from reference_day
+# the spans are fixed so every run times exactly the same days and data, whatever day it's run on (counting back
+# from today would cover no trading days at all on a Monday, and a different number of them from one day to the next)
+sizes = {'1d': 1, '1w': 5, '1mo': 21, '1y': 252}
+reference_day = date(2025, 1, 2)
+
+# where baselines are saved
+baseline_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# bar length in minutes for the supported intervals
+interval_minutes = {'1m': 1, '5m': 5}
+
+
+# SYNTHETIC DATA
+# =================================================================================================================
+# generate made-up open/close bars for a stock, in the same shape yahoo finance returns them
+# each day's prices are a random walk seeded from the stock, day and seed, so any date range always gives the same
+# bars for the same day (and can be used as a bar_cache fetcher, see bar_cache.set_fetcher)
+# provide: target_stock, interval ('1m' or '5m'), start_date and end_date (end date is exclusive), seed
+# returns: dataframe with 'Open' and 'Close' columns indexed by bar time (9:30am to 4pm exchange time, trading days)
+def synthetic_bars(target_stock, interval, start_date, end_date, seed=0):
+    step = interval_minutes[interval]
+    frames = list()
+    day = bar_cache.as_date(start_date)
+    while day < bar_cache.as_date(end_date):
+        if trading_calendar.is_session(day):
+            rng = np.random.default_rng(zlib.crc32(f'{target_stock}{day.isoformat()}{seed}'.encode()))
+            bar_count = 390 // step
+            start_price = 100 + 20 * rng.random()
+            moves = rng.normal(0, 0.0008 * np.sqrt(step), bar_count * 2)
+            prices = start_price * np.exp(np.cumsum(moves))
+            open_time = pd.Timestamp(day).tz_localize(bar_cache.market_timezone) + pd.Timedelta(hours=9, minutes=30)
+            index = pd.date_range(open_time, periods=bar_count, freq=f'{step}min')
+            frames.append(pd.DataFrame({'Open': prices[0::2], 'Close': prices[1::2]}, index=index))
+        day = day + timedelta(days=1)
+    if len(frames) == 0:
+        return pd.DataFrame({'Open': [], 'Close': []},
+                            index=pd.DatetimeIndex([], tz=bar_cache.market_timezone))
+    return pd.concat(frames)
+
+
+# BENCHMARKS
+# =================================================================================================================
+# each benchmark runs the natural workload of a function over the 'sessions' trading days before reference_day
+# first day of a span
+def span_start(sessions):
+    return trading_calendar.session_before(reference_day, sessions)
+
+
+# the span as calendar days back from reference_day (for the functions that count back a number of days)
+def span_days(sessions):
+    return (reference_day - span_start(sessions)).days
+
+
+def sessions_back(sessions):
+    return trading_calendar.sessions_between(span_start(sessions), reference_day)
+
+
+def bench_prep_data(target_stock, sessions):
+    support_functions.prep_data(target_stock, span_start(sessions), reference_day)
+
+
+def bench_recommend_points(target_stock, sessions):
+    for day in sessions_back(sessions):
+        support_functions.recommend_points(target_stock, day, 1)
+
+
+def bench_analyze_stock(target_stock, sessions):
+    for day in sessions_back(sessions):
+        testing.analyze_stock(target_stock, day, 100, 110, 1)
+
+
+def bench_analyze_stock_alternate(target_stock, sessions):
+    for day in sessions_back(sessions):
+        testing.analyze_stock_alternate(target_stock, day, 1)
+
+
+def bench_test_x_days(target_stock, sessions):
+    testing.test_x_days(target_stock, 1, 1, span_days(sessions), reference_day)
+
+
+def bench_test_alternate(target_stock, sessions):
+    testing.test_alternate(target_stock, 1, span_days(sessions), reference_day)
+
+
+def bench_walk_forward(target_stock, sessions):
+    walk_forward.test_x_days_walk_forward(target_stock, 1, 1, span_days(sessions), reference_day)
+
+
+# the shared kernels on their own, over every 1 minute bar in the span joined into one array
+def one_minute_prices(target_stock, sessions):
+    data = support_functions.prep_data(target_stock, span_start(sessions), reference_day, '1m')
+    return data['Average'].to_numpy(dtype=np.float64)
+
+
+def bench_target_kernel(target_stock, sessions, prices=None):
+    trade_kernel.run_target_strategy(prices, np.percentile(prices, 25), np.percentile(prices, 75), 1)
+
+
+def bench_dip_kernel(target_stock, sessions, prices=None):
+    trade_kernel.run_dip_strategy(prices, 1)
+
+
+benchmarks = {'prep_data': bench_prep_data,
+              'recommend_points': bench_recommend_points,
+              'analyze_stock': bench_analyze_stock,
+              'analyze_stock_alternate': bench_analyze_stock_alternate,
+              'test_x_days': bench_test_x_days,
+              'test_alternate': bench_test_alternate,
+              'walk_forward': bench_walk_forward,
+              'target_kernel': bench_target_kernel,
+              'dip_kernel': bench_dip_kernel}
+
+
+# time every benchmark at every size on synthetic data, using a throw-away bar store
+# saved results (results_cache.py) are turned off so the analysis itself is timed
+# each one is run once first to fill the bar store, then timed 'repeat' times and the fastest run is kept
+# (so the times measure the analysis itself, not generating the data)
+# provide: size names to run (keys of sizes), repeat, target_stock name for the synthetic data, seed
+# returns: dictionary of 'benchmark/size' -> seconds
+def run_benchmarks(size_names=None, repeat=3, target_stock='SYNTH', seed=0, names=None):
+    results = dict()
+    old_fetcher = bar_cache.fetcher
+    old_cache_dir = bar_cache.cache_dir
+    old_results_file = results_cache.results_file
+    with tempfile.TemporaryDirectory() as temp_dir, open(os.devnull, 'w') as devnull:
+        bar_cache.set_cache_dir(temp_dir)
+        bar_cache.set_fetcher(lambda *args: synthetic_bars(*args, seed=seed))
+        results_cache.set_results_file(None)
+        try:
+            for size_name in size_names or list(sizes):
+                sessions = sizes[size_name]
+                prices = None
+                for name in names or list(benchmarks):
+                    function = benchmarks[name]
+                    if name.endswith('_kernel'):
+                        if prices is None:
+                            prices = one_minute_prices(target_stock, sessions)
+                        run = lambda: function(target_stock, sessions, prices)
+                    else:
+                        run = lambda: function(target_stock, sessions)
+                    with redirect_stdout(devnull):
+                        run()
+                        timings = list()
+                        for attempt in range(repeat):
+                            started = perf_counter()
+                            run()
+                            timings.append(perf_counter() - started)
+                    results[f'{name}/{size_name}'] = min(timings)
+        finally:
+            bar_cache.set_cache_dir(old_cache_dir)
+            bar_cache.set_fetcher(old_fetcher)
+            results_cache.set_results_file(old_results_file)
+    return results
+
+
+# compare results to a baseline
+# provide: results and baseline (dictionaries from run_benchmarks), tolerance (how much slower counts as a
+#           regression, 0.25 = 25% slower)
+# returns: list of rows [name, seconds, baseline seconds (None if new), ratio, regressed (true/false)]
+def compare(results, baseline, tolerance=0.25):
+    rows = list()
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        ratio = seconds / before if before else None
+        rows.append([name, seconds, before, ratio, ratio is not None and ratio > 1 + tolerance])
+    return rows
+
+
+def load_baseline(path=baseline_file):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as input_file:
+        return json.load(input_file)
+
+
+def save_baseline(results, path=baseline_file):
+    with open(path, 'w') as output_file:
+        json.dump(results, output_file, indent=2, sort_keys=True)
+
+
+def print_report(rows):
+    print(f'{"benchmark":<36}{"seconds":>12}{"baseline":>12}{"ratio":>8}')
+    for name, seconds, before, ratio, regressed in rows:
+        before_text = f'{before:.5f}' if before else '-'
+        ratio_text = f'{ratio:.2f}' if ratio else '-'
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{name:<36}{seconds:>12.5f}{before_text:>12}{ratio_text:>8}{flag}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the analysis functions on synthetic data.')
+    parser.add_argument('--sizes', nargs='+', choices=list(sizes), default=list(sizes))
+    parser.add_argument('--only', nargs='+', choices=list(benchmarks), default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--baseline', default=baseline_file)
+    parser.add_argument('--save', action='store_true', help='save the results as the new baseline')
+    arguments = parser.parse_args()
+
+    results = run_benchmarks(arguments.sizes, arguments.repeat, names=arguments.only)
+    rows = compare(results, load_baseline(arguments.baseline), arguments.tolerance)
+    print_report(rows)
+    if arguments.save:
+        save_baseline({**load_baseline(arguments.baseline), **results}, arguments.baseline)
+        print(f'Baseline saved to {arguments.baseline}')
+    elif any(row[4] for row in rows):
+        sys.exit(1)
@@ -0,0 +1,118 @@
+# This file measures how long each step of the live trading loop takes
+# Timings are kept in small fixed-size histograms (recording one is just a couple of integer operations), so they
+# can stay on for the whole day.  At the end of the day a percentile summary is printed next to the daily summary,
+# and the histograms can be written to a file to compare days or look at where slippage comes from.
+#
+# steps measured by the live engine:
+#   quote - pulling the latest prices
+#   account - loading buying power from the broker
+#   decision - deciding buy/sell for every stock after the prices come back
+#   signal_to_order - from the prices coming back to the order being sent (time spent on our side)
+#   order_ack - from the order being sent to the broker's response (time spent on the API side)
+#   order_fill - from the order being sent to it being finished (filled, cancelled or rejected)
+
+import json
+from contextlib import contextmanager
+from time import perf_counter
+
+# each power of two is split into this many buckets, so a reported time is within 1/8th (12.5%) of the real time
+sub_buckets = 8
+
+
+# histogram of times in whole microseconds
+# times under 16 microseconds get a bucket each, above that each power of two is split into sub_buckets buckets
+class Histogram:
+
+    def __init__(self):
+        self.counts = [0] * (16 + 64 * sub_buckets)
+        self.count = 0
+        self.total = 0
+        self.smallest = None
+        self.largest = 0
+
+    def bucket(self, micros):
+        if micros < 16:
+            return micros
+        shift = micros.bit_length() - 4
+        return 16 + (shift - 1) * sub_buckets + (micros >> shift) - sub_buckets
+
+    # smallest time that lands in a bucket (in microseconds)
+    def bucket_start(self, index):
+        if index < 16:
+            return index
+        shift = (index - 16) // sub_buckets + 1
+        return ((index - 16) % sub_buckets + sub_buckets) << shift
+
+    # record a time given in seconds
+    def record(self, seconds):
+        micros = max(int(seconds * 1000000), 0)
+        self.counts[self.bucket(micros)] += 1
+        self.count = self.count + 1
+        self.total = self.total + micros
+        self.largest = max(self.largest, micros)
+        self.smallest = micros if self.smallest is None else min(self.smallest, micros)
+
+    # time (in seconds) that the given percent of recorded times are at or below
+    def percentile(self, percent):
+        if self.count == 0:
+            return None
+        target = max(int(self.count * percent / 100 + 0.999999), 1)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen = seen + bucket_count
+            if seen >= target:
+                next_start = self.bucket_start(index + 1) if index + 1 < len(self.counts) else self.largest
+                return min(max(next_start - 1, self.bucket_start(index)), self.largest) / 1000000
+        return self.largest / 1000000
+
+    def mean(self):
+        return self.total / self.count / 1000000 if self.count else None
+
+
+# set of histograms, one per step of the loop
+class LatencyRecorder:
+
+    def __init__(self):
+        self.histograms = dict()
+
+    def record(self, step, seconds):
+        if step not in self.histograms:
+            self.histograms[step] = Histogram()
+        self.histograms[step].record(seconds)
+
+    # time a block of code, e.g. "with recorder.timer('quote'):"
+    @contextmanager
+    def timer(self, step):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step, perf_counter() - started)
+
+    # percentile summary for each step, in milliseconds
+    # returns: list of lines to print
+    def summary_lines(self, percents=(50, 90, 99)):
+        lines = ['Latency summary (milliseconds)']
+        for step, histogram in self.histograms.items():
+            values = ', '.join(f'p{percent} {round(histogram.percentile(percent) * 1000, 2)}' for percent in percents)
+            lines.append(f'{step}: {histogram.count} timed, {values}, max {round(histogram.largest / 1000, 2)}')
+        return lines
+
+    def print_summary(self):
+        for line in self.summary_lines():
+            print(line)
+
+    # write every histogram to a json file (bucket start in microseconds -> count, empty buckets left out)
+    def export(self, path):
+        output = dict()
+        for step, histogram in self.histograms.items():
+            output[step] = {'count': histogram.count,
+                            'mean_seconds': histogram.mean(),
+                            'min_seconds': (histogram.smallest or 0) / 1000000,
+                            'max_seconds': histogram.largest / 1000000,
+                            'percentiles_seconds': {str(percent): histogram.percentile(percent)
+                                                    for percent in (50, 90, 95, 99, 99.9)},
+                            'buckets_micros': {str(histogram.bucket_start(index)): bucket_count
+                                               for index, bucket_count in enumerate(histogram.counts) if bucket_count}}
+        with open(path, 'w') as output_file:
+            json.dump(output, output_file, indent=2)
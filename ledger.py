@@ -0,0 +1,70 @@
+# This file keeps a local record of buying power and stock held, updated from the orders the bot itself sends
+# Instead of loading the account profile from Robinhood on every price check, the live engine checks buying power
+# against this record and only reloads the real figure from Robinhood every so often or after an order goes through
+
+from datetime import timedelta
+
+
+# local cash/stock record for the live engine
+# provide: reconcile_every (seconds between reloading buying power from the broker, None to only reload after
+#           orders) and reconcile_after_fill (reload buying power the next time it's needed after an order goes
+#           through, so the local figure picks up exactly what the broker charged/credited)
+class Ledger:
+
+    def __init__(self, reconcile_every=900, reconcile_after_fill=True):
+        self.reconcile_every = reconcile_every
+        self.reconcile_after_fill = reconcile_after_fill
+        self.buying_power = None
+        self.holdings = dict()
+        self.last_reconciled = None
+        self.needs_reconcile = True
+
+    # whether buying power should be reloaded from the broker before it's used at the given time
+    def reconcile_due(self, now):
+        if self.needs_reconcile or self.last_reconciled is None:
+            return True
+        if self.reconcile_every is None:
+            return False
+        return now - self.last_reconciled >= timedelta(seconds=self.reconcile_every)
+
+    # take the broker's buying power as the new local figure
+    def reconcile(self, buying_power, now):
+        self.buying_power = buying_power
+        self.last_reconciled = now
+        self.needs_reconcile = False
+
+    def can_afford(self, amount):
+        return self.buying_power is not None and self.buying_power >= amount
+
+    # set aside the money for a buy as soon as we decide on it, so two stocks can't spend the same dollars
+    def record_buy(self, symbol, quantity, amount):
+        self.buying_power = self.buying_power - amount
+        self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+
+    # sale proceeds aren't added to buying power locally (they may not be available to spend right away in a
+    # cash account), the next reload from the broker picks them up
+    def record_sell(self, symbol, quantity):
+        self.holdings[symbol] = self.holdings.get(symbol, 0) - quantity
+
+    # an order went through, reload buying power before it's next needed (if reconcile_after_fill is on)
+    def order_filled(self):
+        if self.reconcile_after_fill:
+            self.needs_reconcile = True
+
+    # only part of an order went through, put back the stock that didn't buy/sell and reload buying power before it's
+    # next needed (the broker's figure has what was really spent)
+    def order_part_filled(self, side, symbol, unfilled_quantity):
+        if side == 'buy':
+            self.holdings[symbol] = self.holdings.get(symbol, 0) - unfilled_quantity
+        else:
+            self.holdings[symbol] = self.holdings.get(symbol, 0) + unfilled_quantity
+        self.needs_reconcile = True
+
+    # an order failed, undo what was recorded for it and reload buying power before it's next needed
+    def order_failed(self, side, symbol, quantity, amount):
+        if side == 'buy':
+            self.buying_power = self.buying_power + amount
+            self.holdings[symbol] = self.holdings.get(symbol, 0) - quantity
+        else:
+            self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        self.needs_reconcile = True
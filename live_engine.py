@@ -0,0 +1,320 @@
+# This file trades a whole watchlist of stocks from a single process and a single login
+# Each minute it pulls the latest price for every stock in one request, decides what to do for each stock using the
+# same logic as robinhood.py/alternate_approach.py (see trading_logic.py), and sends any orders in the background so
+# a slow order for one stock never holds up decisions for the others.
+# Stock remaining at the end of the day (unsold) will be left for the user to decide what to do with it.
+
+import asyncio
+import sys
+from datetime import datetime
+from time import perf_counter
+from api_client import default_client
+from latency import LatencyRecorder
+from ledger import Ledger
+from order_tracking import final_states, order_id, track_fill
+from premarket import load_table, startup_points, startup_stats
+from rolling_stats import seed_interval
+from scheduler import TickScheduler
+from session import log_in, resume_positions, save_positions
+from tick_journal import TickJournal
+from trading_logic import (new_position, decide, record_buy, record_sell, apply_buy_fill, apply_sell_fill,
+                           print_summary)
+
+# USER INPUTS
+# Change these values
+# =================================================================================================================
+# See robinhood.py for details on login/MFA.  Each watchlist entry is one stock to trade:
+# 'target' entries buy below buy_price and sell above sell_price (robinhood.py approach)
+# 'dip' entries buy at every dip and sell at every peak (alternate_approach.py approach)
+# 'target' entries can set 'std_use' instead of buy_price/sell_price to have buy/sell prices follow the market: they
+# start out std_use standard deviations below/above the average of the last 5 trading days, in bars as close as
+# possible to check_interval apart (see rolling_stats.seed_interval), and are updated with every price check
+# 'target' entries can set 'points_std' instead of buy_price/sell_price to use fixed prices that many standard
+# deviations below/above the recent average (same as recommend_points)
+# both are taken from thresholds_file if it has the stock for today (run premarket.py before the open), otherwise
+# each stock's history is downloaded at startup
+username = 'example@email.com'      # Robinhood username (usually your login email)
+password = 'Password123'            # Robinhood password
+mfa = '123456'                      # MFA code (if MFA turned on - user will be prompted in terminal if error)
+watchlist = [
+    {'target_stock': 'MSFT', 'spend': 1, 'strategy': 'target', 'buy_price': 19.75, 'sell_price': 20.25},
+    {'target_stock': 'AAPL', 'spend': 1, 'strategy': 'dip'},
+    {'target_stock': 'AMD', 'spend': 1, 'strategy': 'target', 'std_use': 1},
+    {'target_stock': 'NVDA', 'spend': 1, 'strategy': 'target', 'points_std': 1},
+]
+check_interval = 60                 # seconds between price checks, lined up with the clock (60 = on the minute)
+latency_file = 'latency.json'       # file the day's timings are written to (see latency.py), None to skip
+journal_file = 'watchlist.journal'  # file every price check and order is recorded to (see tick_journal.py), None to skip
+reconcile_every = 900               # seconds between reloading buying power from Robinhood (it's also reloaded
+                                    # after every order), in between the bot keeps its own running figure
+state_file = 'watchlist_state.json' # file each stock's state is saved to after every price check, None to skip
+thresholds_file = 'thresholds.npy'  # file written by premarket.py with each stock's prices/history for today, None
+                                    # to always download history at startup
+warm_start = False                  # True (or run with --warm-start) to restart mid-day: picks up each stock's saved
+                                    # state, last price and rolling average, so trading resumes on the first check
+
+
+# CLOCK AND BROKER
+# =================================================================================================================
+# the engine asks a clock for the time and to wait between checks, and a broker for prices and to place orders
+# live trading uses the real clock and Robinhood, replay.py swaps in a simulated clock and broker to run the same
+# engine over recorded price data
+
+# real time clock
+class WallClock:
+
+    def now(self):
+        return datetime.now()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+# all calls out to Robinhood go through here; these are blocking calls, the engine runs them on worker threads
+# calls are rate limited, retried and shared through an api_client.ApiClient (one client for the whole process by
+# default, so every broker counts against the same rate limit)
+class RobinhoodBroker:
+    blocking = True
+
+    def __init__(self, client=None):
+        self.client = client or default_client()
+
+    # latest price for every stock in the list, pulled in a single request
+    def get_prices(self, symbols):
+        return [float(price) for price in self.client.latest_prices(symbols)]
+
+    def buying_power(self):
+        return float(self.client.account_profile()['buying_power'])
+
+    def buy(self, symbol, quantity):
+        return self.client.buy(symbol, quantity)
+
+    def sell(self, symbol, quantity):
+        return self.client.sell(symbol, quantity)
+
+    # current info for an order (state, filled quantity, average fill price...)
+    def order_status(self, order_id):
+        return self.client.order_info(order_id)
+
+    # cancel whatever hasn't filled yet of an order
+    def cancel_order(self, order_id):
+        return self.client.cancel_order(order_id)
+
+
+# ENGINE
+# =================================================================================================================
+# call a broker method, on a worker thread if it's a blocking (network) call so the engine keeps running meanwhile
+async def call_broker(broker, method, *args):
+    if getattr(broker, 'blocking', True):
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+# add an order event to the tick journal (if there is one)
+def journal_order(engine, symbol, price, event, placed_id):
+    if engine['journal']:
+        engine['journal'].record(engine['clock'].now().timestamp(), symbol, price, event, placed_id)
+
+
+# send an order, follow it until it's finished, and update the stock's totals and the ledger from the real fill
+# runs in the background: other stocks keep trading meanwhile, and this stock makes no new decisions until it's done
+# provide: engine (dictionary of the engine's broker/clock/ledger/latency, see run_engine), side ('buy' or 'sell'),
+#           position the order is for, quantity, price the decision was made at and quoted_at (perf_counter time
+#           the price came back, used to time signal -> order)
+async def submit_order(engine, side, position, quantity, price, quoted_at):
+    broker = engine['broker']
+    ledger = engine['ledger']
+    symbol = position['symbol']
+    sent_at = perf_counter()
+    order_time = engine['clock'].now()
+    engine['latency'].record('signal_to_order', sent_at - quoted_at)
+    state, filled, fill_price = ['failed', 0, None]
+    placed_id = None
+    try:
+        if side == 'buy':
+            response = await call_broker(broker, broker.buy, symbol, quantity)
+        else:
+            response = await call_broker(broker, broker.sell, symbol, quantity)
+        engine['latency'].record('order_ack', perf_counter() - sent_at)
+        print(response)
+        placed_id = order_id(response)
+        if placed_id is not None:
+            journal_order(engine, symbol, price, 'ordered', placed_id)
+    except Exception as error:
+        print(f'{side} order for {quantity} of {symbol} failed: {error}')
+
+    # once the order has been accepted it's followed until Robinhood confirms how it ended
+    if placed_id is not None:
+        state, filled, fill_price = await track_fill(
+            lambda: call_broker(broker, broker.order_status, placed_id), placed_id,
+            engine['order_poll_interval'], engine['order_timeout'],
+            lambda: call_broker(broker, broker.cancel_order, placed_id), clock=engine['clock'])
+        engine['latency'].record('order_fill', perf_counter() - sent_at)
+        if state not in final_states:
+            # it may still fill: leave the stock waiting on the order (no new decisions) and the ledger as it is,
+            # rather than guess and risk buying twice or selling stock we no longer hold
+            journal_order(engine, symbol, price, 'unconfirmed', placed_id)
+            print(f'Could not confirm how the {side} order {placed_id} for {symbol} ended, {symbol} will stop '
+                  f'trading until you check it on Robinhood.')
+            return None
+
+    if side == 'buy':
+        apply_buy_fill(position, quantity, filled, fill_price)
+    else:
+        apply_sell_fill(position, quantity, price, filled, fill_price)
+    position['pending'] = False
+
+    if filled <= 0 or fill_price is None:
+        journal_order(engine, symbol, price, 'failed', placed_id)
+        ledger.order_failed(side, symbol, quantity, position['spend'])
+        print(f'{side} order for {quantity} of {symbol} sent at {order_time} did not go through ({state}).')
+        return None
+    journal_order(engine, symbol, fill_price, 'filled', placed_id)
+    if filled < quantity:
+        ledger.order_part_filled(side, symbol, quantity - filled)
+    else:
+        ledger.order_filled()
+    print(f'{"bought" if side == "buy" else "sold"} {filled} of {symbol} at {order_time} at {fill_price} '
+          f'(decided at {price})')
+    return response
+
+
+# decide for each stock given this check's prices and send orders without waiting on them
+# provide: engine (see run_engine), positions (list from trading_logic.new_position), prices (latest price for each
+#           position) and quoted_at (perf_counter time the prices came back)
+def run_tick(engine, positions, prices, quoted_at):
+    ledger = engine['ledger']
+    journal = engine['journal']
+    tick_time = engine['clock'].now().timestamp() if journal else None
+    for position, current_price in zip(positions, prices):
+        action = decide(position, current_price)
+        if journal:
+            journal.record(tick_time, position['symbol'], current_price, action)
+        if action == 'buy':
+            # check to make sure we still have enough money left to keep buying, otherwise stop trading this stock
+            if not ledger.can_afford(position['spend']):
+                print(f'Your buying power is less than your specified spend amount for {position["symbol"]}.  '
+                      f'This stock will stop trading.')
+                position['active'] = False
+                continue
+            quantity = record_buy(position, current_price)
+            ledger.record_buy(position['symbol'], quantity, position['spend'])
+        elif action == 'sell':
+            quantity = record_sell(position, current_price)
+            ledger.record_sell(position['symbol'], quantity)
+        else:
+            continue
+        position['pending'] = True
+        task = asyncio.create_task(submit_order(engine, action, position, quantity, current_price, quoted_at))
+        engine['pending'].add(task)
+        task.add_done_callback(engine['pending'].discard)
+
+
+# trade every stock in the watchlist until the end of the trading window, then print each stock's daily summary
+# provide: positions (list from trading_logic.new_position), broker (e.g. RobinhoodBroker()),
+#           start_time and end_time of the trading window, check_interval (seconds between price checks),
+#           clock (defaults to the real time clock), ledger (defaults to a ledger.Ledger with default settings),
+#           latency (latency.LatencyRecorder to time each step in, a new one by default), latency_file (if
+#           given, the timings are written to this file at the end of the day), order_poll_interval and
+#           order_timeout (seconds between checks on an order that hasn't finished, and how long to keep checking)
+#           journal (tick_journal.TickJournal to record every price check and order in, None to skip) and
+#           state_file (file each stock's state is saved to after every price check for a warm start, see session.py)
+# buying power is only loaded from the broker when the ledger says it's due, not on every price check
+# price checks run on clock boundaries of check_interval seconds (see scheduler.py), the first check runs right away
+async def run_engine(positions, broker, start_time, end_time, check_interval=60, clock=None, ledger=None,
+                     latency=None, latency_file=None, order_poll_interval=1, order_timeout=120, journal=None,
+                     state_file=None):
+    clock = clock or WallClock()
+    engine = {'broker': broker,
+              'clock': clock,
+              'ledger': ledger or Ledger(),
+              'latency': latency or LatencyRecorder(),
+              'order_poll_interval': order_poll_interval,
+              'order_timeout': order_timeout,
+              'journal': journal,
+              'pending': set()}
+    ledger = engine['ledger']
+    latency = engine['latency']
+    scheduler = TickScheduler(clock, check_interval)
+    current_time = clock.now()
+    while start_time < current_time < end_time:
+        active = [position for position in positions if position['active']]
+        if len(active) == 0:
+            break
+        try:
+            with latency.timer('quote'):
+                prices = await call_broker(broker, broker.get_prices, [position['symbol'] for position in active])
+            quoted_at = perf_counter()
+            if any(position['action'] == 'buy' for position in active) and ledger.reconcile_due(current_time):
+                with latency.timer('account'):
+                    ledger.reconcile(await call_broker(broker, broker.buying_power), current_time)
+        except Exception as error:
+            # the API client has already tried again, so skip this check and carry on at the next one
+            print(f'Price check at {current_time} failed, skipping it: {error}')
+            await scheduler.wait()
+            current_time = clock.now()
+            continue
+        with latency.timer('decision'):
+            run_tick(engine, active, prices, quoted_at)
+        if journal:
+            journal.flush()
+        if state_file:
+            save_positions(state_file, positions, current_time)
+
+        await scheduler.wait()
+        current_time = clock.now()
+
+    # let any orders still in flight finish before reporting
+    if engine['pending']:
+        await asyncio.gather(*engine['pending'], return_exceptions=True)
+    if journal:
+        journal.close()
+    if state_file:
+        save_positions(state_file, positions, clock.now())
+    for position in positions:
+        print_summary(position)
+    print(scheduler.summary())
+    latency.print_summary()
+    if latency_file:
+        latency.export(latency_file)
+    return positions
+
+
+# build positions from the watchlist entries above
+# entries with a 'std_use' get rolling stats seeded from historical data leading up to start_date (defaults to
+# today), and entries with a 'points_std' get buy/sell prices from it
+# provide: entries, start_date, table (from premarket.load_table; stocks that aren't in it for the day have their
+#           history pulled here instead) and interval (bar interval the rolling stats are seeded from, the one closest
+#           to check_interval - see rolling_stats.seed_interval)
+def positions_from_watchlist(entries, start_date=None, table=None, interval='1m'):
+    positions = list()
+    for entry in entries:
+        stats = startup_stats(table, entry['target_stock'], start_date, interval) if 'std_use' in entry else None
+        if 'points_std' in entry:
+            buy_price, sell_price = startup_points(table, entry['target_stock'], entry['points_std'], start_date)
+        else:
+            buy_price, sell_price = entry.get('buy_price', 0), entry.get('sell_price', 0)
+        positions.append(new_position(entry['target_stock'], entry['spend'], entry.get('strategy', 'target'),
+                                      buy_price, sell_price, stats, entry.get('std_use', 1)))
+    return positions
+
+
+if __name__ == '__main__':
+    for entry in watchlist:
+        if entry['spend'] < 1:
+            exit(f'The spend amount for {entry["target_stock"]} must be at least $1 for fractional trading.')
+
+    # time range is set to 9:05am to 4:55pm; you can change this to whatever trade window you want
+    now = datetime.now()
+    start_time = now.replace(hour=9, minute=5, second=0, microsecond=0)
+    end_time = now.replace(hour=16, minute=55, second=0, microsecond=0)
+
+    log_in(username, password, mfa)
+    positions = positions_from_watchlist(watchlist, table=load_table(thresholds_file),
+                                         interval=seed_interval(check_interval))
+    if warm_start or '--warm-start' in sys.argv:
+        resume_positions(positions, journal_file=journal_file, state_file=state_file,
+                         check_interval=check_interval)
+    asyncio.run(run_engine(positions, RobinhoodBroker(), start_time, end_time,
+                           check_interval, ledger=Ledger(reconcile_every), latency_file=latency_file,
+                           journal=TickJournal(journal_file) if journal_file else None, state_file=state_file))
@@ -0,0 +1,109 @@
+# This file tests how well a pair of buy/sell prices holds up across thousands of made-up trading days
+# analyze_stock only runs a day's one real price path, which says little about whether the prices were good or just
+# lucky.  Here the bar-to-bar price moves from the historical data (the same 'Average' series recommend_points uses)
+# are resampled into thousands of new intraday price paths at once, in blocks of moves if block_length is set so
+# short runs of rises/drops are kept, and both approaches are run over every path together (one row per path, see
+# trade_kernel.py).  The result is the spread of profit, trade count and stock left over across all of the paths.
+
+from datetime import date
+import numpy as np
+import pandas as pd
+from support_functions import date_ranges, prep_data, thresholds_from_history
+from trade_kernel import run_target_strategy_by_row, run_dip_strategy_by_row
+
+# percentiles reported for each measure
+percentiles = [5, 25, 50, 75, 95]
+
+# columns of the summary returned by summarize_paths
+summary_columns = ['strategy', 'measure', 'mean', 'std'] + [f'p{percentile}' for percentile in percentiles] + \
+                  ['chance_above_zero']
+
+
+# price moves from one bar to the next as log returns, only within a day (the overnight gap isn't an intraday move)
+# provide: historical_data from prep_data
+# returns: numpy array of log returns
+def intraday_returns(historical_data):
+    prices = historical_data['Average'].dropna()
+    days = prices.index.normalize()
+    values = prices.to_numpy(dtype=np.float64)
+    same_day = days[1:] == days[:-1]
+    return np.log(values[1:] / values[:-1])[same_day]
+
+
+# typical number of bars in a day of the historical data (the length of each made-up path)
+def bars_per_day(historical_data):
+    prices = historical_data['Average'].dropna()
+    counts = prices.groupby(prices.index.date).size()
+    return int(counts.median()) if len(counts) > 0 else 0
+
+
+# make up price paths by resampling historical moves, all paths at once
+# each path starts at start_price and is built from moves drawn at random (with replacement) from 'returns', in runs
+# of block_length moves in a row taken from the same spot (block_length=1 draws every move on its own)
+# provide: returns from intraday_returns, start_price, path_length (bars per path), path_count, block_length and
+#           seed (for the same paths every time)
+# returns: 2D numpy array of prices, one path per row
+def simulate_paths(returns, start_price, path_length, path_count, block_length=1, seed=None):
+    generator = np.random.default_rng(seed)
+    move_count = max(path_length - 1, 0)
+    block_length = max(min(block_length, len(returns)), 1)
+    block_count = -(-move_count // block_length)
+    starts = generator.integers(0, len(returns) - block_length + 1, size=(path_count, block_count))
+    picks = (starts[:, :, None] + np.arange(block_length)).reshape(path_count, -1)[:, :move_count]
+    paths = np.empty((path_count, path_length))
+    paths[:, :1] = start_price
+    paths[:, 1:] = start_price * np.exp(np.cumsum(returns[picks], axis=1))
+    return paths
+
+
+# run both approaches over every path at once
+# provide: paths from simulate_paths, buy_price and sell_price (for the primary approach) and spend
+# returns: dictionary of approach ('target' or 'dip') -> list of arrays (one value per path) of bought, sold, count,
+#           profit, holding (see summarize_trades)
+def evaluate_paths(paths, buy_price, sell_price, spend):
+    buy_prices = np.full(len(paths), buy_price)
+    sell_prices = np.full(len(paths), sell_price)
+    return {'target': run_target_strategy_by_row(paths, buy_prices, sell_prices, spend),
+            'dip': run_dip_strategy_by_row(paths, spend)}
+
+
+# spread of profit, trade count and stock left over for each approach
+# returns: dataframe with one row per approach/measure (see summary_columns)
+def summarize_paths(results):
+    rows = list()
+    for strategy, info in results.items():
+        for measure, values in (('profit', info[3]), ('count', info[2]), ('holding', info[4])):
+            values = np.asarray(values, dtype=np.float64)
+            rows.append([strategy, measure, values.mean(), values.std()] + list(np.percentile(values, percentiles)) +
+                        [(values > 0).mean()])
+    return pd.DataFrame(rows, columns=summary_columns)
+
+
+# test a stock's recommended buy/sell prices for a day against made-up price paths
+# paths are built from the moves in the 5 trading days before the day (the same history recommend_points uses) and
+# start at the last price in that history
+# provide: target_stock (ticker e.g. 'MSFT'), day (defaults to today), std_use, spend, path_count, block_length,
+#           seed and the bar interval
+# returns: list with the summary dataframe (see summarize_paths), the per-path results (see evaluate_paths) and the
+#           buy/sell prices used
+def monte_carlo(target_stock, std_use, spend, day=None, path_count=10000, block_length=1, seed=None, interval='5m'):
+    date_list = date_ranges(day or date.today())
+    historical_data = prep_data(target_stock, date_list[1], date_list[2], interval)
+    buy_price, sell_price = thresholds_from_history(historical_data, std_use)
+    returns = intraday_returns(historical_data)
+    if len(returns) == 0:
+        raise ValueError(f'No price history for {target_stock} before {day or date.today()}')
+    paths = simulate_paths(returns, historical_data['Average'].dropna().iloc[-1], bars_per_day(historical_data),
+                           path_count, block_length, seed)
+    results = evaluate_paths(paths, buy_price, sell_price, spend)
+    return [summarize_paths(results), results, [buy_price, sell_price]]
+
+
+# print how the recommended prices hold up over made-up days, next to the usual test reports in testing.py
+def test_monte_carlo(target_stock, std_use, spend, path_count=10000, block_length=1, seed=None):
+    summary, results, prices = monte_carlo(target_stock, std_use, spend, path_count=path_count,
+                                           block_length=block_length, seed=seed)
+    print(f'{target_stock} over {path_count} simulated days, buying at {round(prices[0], 4)} and selling at '
+          f'{round(prices[1], 4)} (dip approach buys/sells every dip/peak):')
+    print(summary.round(4).to_string(index=False))
+    return summary
@@ -0,0 +1,76 @@
+# This file follows an order after it's been sent until Robinhood reports how it turned out
+# Robinhood accepts an order right away and fills it afterwards, so the order response alone doesn't tell us the
+# price we actually got, how much stock we actually got, or whether the order was rejected.  The live engine uses
+# track_fill in the background for each order and updates the stock's totals from the real fill.
+
+import asyncio
+from datetime import datetime
+
+# order states Robinhood reports once an order is finished, anything else means it's still being worked on
+final_states = ('filled', 'cancelled', 'rejected', 'failed')
+
+
+# id of an order from the response to sending it (Robinhood returns an error message without an id if the order
+# wasn't accepted)
+def order_id(response):
+    if isinstance(response, dict):
+        return response.get('id')
+    return None
+
+
+# read the state, filled quantity and average fill price out of an order's info
+# returns: list of state, filled quantity and average fill price (None if nothing filled)
+def fill_details(order_info):
+    state = order_info.get('state', 'unknown')
+    filled = float(order_info.get('cumulative_quantity') or 0)
+    average_price = order_info.get('average_price')
+    average_price = float(average_price) if average_price not in (None, '') else None
+    if filled > 0 and average_price is None:
+        executions = order_info.get('executions') or []
+        executed = sum(float(execution['quantity']) for execution in executions)
+        if executed > 0:
+            average_price = sum(float(execution['quantity']) * float(execution['price'])
+                                for execution in executions) / executed
+    return [state, filled, average_price]
+
+
+# check on an order until it's finished
+# the first check happens right away, then every poll_interval seconds; other stocks keep trading meanwhile
+# a check that fails (e.g. a dropped connection) is reported and tried again at the next poll - the order was already
+# accepted, so it may still fill and is never treated as failed because of it
+# if the order isn't finished after timeout seconds, whatever is left of it is cancelled and it's checked until
+# Robinhood confirms how it ended, so a late fill is still counted
+# provide: get_status (async function returning the order's info, e.g. a call to the broker's order_status),
+#           order_id (only used for messages), poll_interval and timeout in seconds, cancel (async function cancelling
+#           the order, None to only wait), confirm_timeout (seconds to keep checking after the cancel) and clock
+#           (the engine's clock, anything with now() and an async sleep(seconds), see live_engine.WallClock; defaults
+#           to real time) so waits and timeouts follow simulated time in a replay
+# returns: list of state, filled quantity and average fill price (see fill_details); the state is 'unconfirmed' if
+#           the order still wasn't finished (or couldn't be checked) at the end
+async def track_fill(get_status, order_id, poll_interval=1, timeout=120, cancel=None, confirm_timeout=60, clock=None):
+    now = clock.now if clock is not None else datetime.now
+    sleep = clock.sleep if clock is not None else asyncio.sleep
+    started = now()
+    details = ['unconfirmed', 0, None]
+    cancelled = False
+    while True:
+        try:
+            details = fill_details(await get_status())
+        except Exception as error:
+            print(f'Could not check on order {order_id}, trying again: {error}')
+        else:
+            if details[0] in final_states:
+                return details
+
+        waited = (now() - started).total_seconds()
+        if waited >= timeout and cancel is not None and not cancelled:
+            print(f'Order {order_id} is still {details[0]} after {timeout} seconds, cancelling what is left of it.')
+            try:
+                await cancel()
+                cancelled = True
+            except Exception as error:
+                print(f'Could not cancel order {order_id}, trying again: {error}')
+        if waited >= timeout + (confirm_timeout if cancel is not None else 0):
+            print(f'Order {order_id} is still not confirmed finished after {round(waited)} seconds.')
+            return ['unconfirmed', details[1], details[2]]
+        await sleep(poll_interval)
@@ -0,0 +1,187 @@
+# This file works out buy/sell prices for a whole watchlist before the market opens, so the live bot doesn't have to
+# Missing history for every stock is pulled together in bulk (see bar_cache.prefetch), then each stock's average,
+# standard deviation and history prices (the same 5 trading days recommend_points and seed_from_history use) are
+# worked out across all CPU cores and written to one file, sorted by ticker.  The live code opens the file
+# memory-mapped and looks each stock up by ticker, so starting up takes milliseconds and downloads nothing.
+#
+# run from the terminal before the open:
+#   python premarket.py MSFT AAPL AMD                         - writes thresholds.npy for today
+#   python premarket.py --file tickers.txt --out thresholds.npy --day 2025-06-02
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import numpy as np
+import bar_cache
+from rolling_stats import seed_from_history, stats_from_prices
+from screener import read_tickers
+from support_functions import date_ranges, prep_data, recommend_points
+from sweep import init_worker
+
+
+# longest ticker stored in the file
+symbol_length = 12
+
+
+# layout of one stock's record: the day it's for, average and standard deviation of its history (buy/sell prices are
+# average -/+ standard deviation x std_use, same as thresholds_from_history), the bar interval of the history prices
+# kept for seeding rolling stats, how many there are and the prices themselves (padded with nan up to the longest
+# history in the file)
+def record_dtype(history_length):
+    return np.dtype([('symbol', f'U{symbol_length}'), ('day', 'datetime64[D]'), ('mean', np.float64),
+                     ('std', np.float64), ('interval', 'U4'), ('count', np.int32),
+                     ('history', np.float64, (history_length,))])
+
+
+# one stock's average and standard deviation (from 'interval' bars, same as recommend_points) and history prices for
+# rolling stats (from 'stats_interval' bars, same as seed_from_history) for a day, pulled from the bar store
+# returns: list of ticker, mean, standard deviation and numpy array of history prices
+def ticker_history(target_stock, day, interval='5m', stats_interval='1m'):
+    date_list = date_ranges(day)
+    historical_data = prep_data(target_stock, date_list[1], date_list[2], interval)
+    if stats_interval != interval:
+        history = prep_data(target_stock, date_list[1], date_list[2], stats_interval)['Average']
+    else:
+        history = historical_data['Average']
+    return [target_stock, historical_data['Average'].mean(), historical_data['Average'].std(),
+            history.dropna().to_numpy(dtype=np.float64)]
+
+
+# work out every stock's record for a day
+# provide: tickers (list e.g. ['MSFT', 'AAPL', ...]), day the prices are for (defaults to today), bar interval for
+#           the buy/sell prices, processes (number of processes, defaults to the number of CPUs; use 1 to run
+#           everything in this process) and stats_interval (bar interval of the history kept for rolling stats, the
+#           one closest to the live check_interval - see rolling_stats.seed_interval)
+# returns: numpy array of records (see record_dtype), sorted by ticker
+def build_table(tickers, day=None, interval='5m', processes=None, stats_interval='1m'):
+    day = day or date.today()
+    tickers = sorted(set(ticker.upper() for ticker in tickers))
+    date_list = date_ranges(day)
+    for bar_interval in sorted({interval, stats_interval}):
+        bar_cache.prefetch(tickers, date_list[1], date_list[2], bar_interval)
+    if processes == 1 or len(tickers) < 2:
+        results = [ticker_history(ticker, day, interval, stats_interval) for ticker in tickers]
+    else:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=init_worker,
+                                 initargs=(bar_cache.cache_dir, bar_cache.fetcher)) as pool:
+            results = list(pool.map(ticker_history, tickers, [day] * len(tickers), [interval] * len(tickers),
+                                    [stats_interval] * len(tickers),
+                                    chunksize=max(len(tickers) // (4 * (processes or os.cpu_count())), 1)))
+
+    table = np.zeros(len(results), dtype=record_dtype(max([len(result[3]) for result in results] + [1])))
+    table['symbol'] = [result[0] for result in results]
+    table['day'] = np.datetime64(day, 'D')
+    table['mean'] = [result[1] for result in results]
+    table['std'] = [result[2] for result in results]
+    table['interval'] = stats_interval
+    table['count'] = [len(result[3]) for result in results]
+    table['history'] = np.nan
+    for row, result in enumerate(results):
+        table['history'][row, :len(result[3])] = result[3]
+    return table
+
+
+# write the records to a file (written to a temporary file first, so the live bot never opens a half written file)
+def write_table(path, table):
+    temp_path = f'{path}.{os.getpid()}.tmp.npy'
+    np.save(temp_path, table)
+    os.replace(temp_path, path)
+
+
+# work out and write the records for a whole watchlist (see build_table)
+# returns: numpy array of records written
+def precompute(tickers, path='thresholds.npy', day=None, interval='5m', processes=None, stats_interval='1m'):
+    table = build_table(tickers, day, interval, processes, stats_interval)
+    write_table(path, table)
+    return table
+
+
+# LIVE STARTUP
+# =================================================================================================================
+# open a file written by precompute (memory-mapped, nothing is read until a stock is looked up)
+# returns: numpy array of records, or None if there's no file
+def load_table(path):
+    if path is None or not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+# find a stock's record for a day (defaults to today)
+# a stock with too little history to work out prices from (fewer than two prices) counts as not being in the file,
+# so the live code falls back to downloading its history
+# returns: the record, or None if the stock isn't in the file (or has no usable prices) or the file was made for a
+#           different day
+def lookup(table, symbol, day=None):
+    if table is None or len(table) == 0:
+        return None
+    symbol = symbol.upper()
+    row = int(np.searchsorted(table['symbol'], symbol))
+    if row >= len(table) or table['symbol'][row] != symbol:
+        return None
+    record = table[row]
+    if record['day'] != np.datetime64(day or date.today(), 'D'):
+        return None
+    if record['count'] < 2 or not (np.isfinite(record['mean']) and np.isfinite(record['std'])):
+        return None
+    return record
+
+
+# buy/sell prices for a stock, a factor of standard deviation below/above its average (same as recommend_points)
+# returns: list of buy price and sell price, or None if the stock has no record for the day
+def points_from_table(table, symbol, std_use, day=None):
+    record = lookup(table, symbol, day)
+    if record is None:
+        return None
+    standard_deviation = float(record['std']) * std_use
+    return [float(record['mean']) - standard_deviation, float(record['mean']) + standard_deviation]
+
+
+# rolling stats for a stock seeded from its stored history prices (same as rolling_stats.seed_from_history)
+# returns: RollingStats, or None if the stock has no record for the day or its history is a different bar interval
+def stats_from_table(table, symbol, day=None, window=None, interval='1m'):
+    record = lookup(table, symbol, day)
+    if record is None or record['interval'] != interval:
+        return None
+    return stats_from_prices(record['history'][:int(record['count'])], window)
+
+
+# buy/sell prices for the live code to start with: from the file if it has the stock for the day, otherwise worked
+# out from a fresh download (recommend_points)
+# provide: table from load_table (None if there's no file), symbol, std_use and day (defaults to today)
+def startup_points(table, symbol, std_use, day=None):
+    points = points_from_table(table, symbol, std_use, day)
+    if points is None:
+        if table is not None:
+            print(f'No pre-market prices for {symbol} today (see premarket.py), pulling its history instead.')
+        points = recommend_points(symbol, day or date.today(), std_use)
+    return points
+
+
+# rolling stats for the live code to start with: from the file if it has the stock's history for the day at the
+# given bar interval (see rolling_stats.seed_interval), otherwise seeded from a fresh download (seed_from_history)
+def startup_stats(table, symbol, day=None, interval='1m'):
+    stats = stats_from_table(table, symbol, day, interval=interval)
+    if stats is None:
+        if table is not None:
+            print(f'No pre-market {interval} history for {symbol} today (see premarket.py), pulling its history '
+                  f'instead.')
+        stats = seed_from_history(symbol, day, interval=interval)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Work out buy/sell prices for a watchlist before the open.')
+    parser.add_argument('tickers', nargs='*')
+    parser.add_argument('--file', help='text file of tickers')
+    parser.add_argument('--out', default='thresholds.npy', help='file to write (loaded by the live code)')
+    parser.add_argument('--day', type=date.fromisoformat, default=date.today(), help='day to trade (YYYY-MM-DD)')
+    parser.add_argument('--processes', type=int, help='number of processes (defaults to the number of CPUs)')
+    parser.add_argument('--stats-interval', default='1m', help='bar interval of the history for rolling stats '
+                                                               '(closest to the live check_interval)')
+    arguments = parser.parse_args()
+
+    tickers = [ticker.upper() for ticker in arguments.tickers] + (read_tickers(arguments.file) if arguments.file else [])
+    table = precompute(tickers, arguments.out, arguments.day, processes=arguments.processes,
+                       stats_interval=arguments.stats_interval)
+    print(f'Wrote buy/sell prices for {len(table)} stocks for {arguments.day} to {arguments.out}')
@@ -0,0 +1,133 @@
+# This file replays recorded price bars through the live trading engine (live_engine.py) with a simulated broker
+# The decisions come from the exact same code the live bot runs, only the clock and the broker are swapped out:
+# the clock jumps straight from one check to the next instead of waiting, and orders are filled in memory at the
+# current price instead of being sent to Robinhood.  A full trading day replays in well under a second.
+
+import asyncio
+import os
+from contextlib import nullcontext, redirect_stdout
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from bar_cache import interval_seconds, load_arrays, market_timezone
+from live_engine import run_engine, positions_from_watchlist
+from trading_calendar import sessions_between
+
+
+# simulated clock, time only moves when the engine sleeps
+# before moving time forward it lets any orders the engine just sent run, so they fill at the price they were sent at
+class ReplayClock:
+
+    def __init__(self, start_time):
+        self.current_time = start_time
+
+    def now(self):
+        return self.current_time
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(0)
+        self.current_time = self.current_time + timedelta(seconds=seconds)
+
+
+# in-memory broker, prices come from recorded bars and orders fill immediately at the current price
+# provide: clock (ReplayClock), prices (dictionary of ticker -> [bar times, bar prices]) where bar times are naive
+#           exchange-time numpy datetime64 values, and cash (starting buying power)
+class SimulatedBroker:
+    blocking = False
+
+    def __init__(self, clock, prices, cash=1000):
+        self.clock = clock
+        self.prices = prices
+        self.cash = cash
+        self.holdings = dict()
+        self.orders = list()
+
+    # latest recorded price at or before the current time (first bar's price if we're before the first bar)
+    def latest_price(self, symbol):
+        times, values = self.prices[symbol]
+        position = np.searchsorted(times, np.datetime64(self.clock.now()), side='right') - 1
+        return float(values[max(position, 0)])
+
+    def get_prices(self, symbols):
+        return [self.latest_price(symbol) for symbol in symbols]
+
+    def buying_power(self):
+        return self.cash
+
+    def place_order(self, side, symbol, quantity):
+        price = self.latest_price(symbol)
+        if side == 'buy':
+            self.cash = self.cash - quantity * price
+            self.holdings[symbol] = self.holdings.get(symbol, 0) + quantity
+        else:
+            self.cash = self.cash + quantity * price
+            self.holdings[symbol] = self.holdings.get(symbol, 0) - quantity
+        order = {'id': str(len(self.orders) + 1), 'state': 'filled', 'side': side, 'symbol': symbol,
+                 'quantity': quantity, 'price': price, 'cumulative_quantity': quantity, 'average_price': price,
+                 'created_at': self.clock.now()}
+        self.orders.append(order)
+        return order
+
+    def order_status(self, order_id):
+        return self.orders[int(order_id) - 1]
+
+    # orders fill as soon as they're placed, so there's never anything left to cancel
+    def cancel_order(self, order_id):
+        return self.orders[int(order_id) - 1]
+
+    def buy(self, symbol, quantity):
+        return self.place_order('buy', symbol, quantity)
+
+    def sell(self, symbol, quantity):
+        return self.place_order('sell', symbol, quantity)
+
+
+# recorded prices for one stock on one day as naive exchange-time bar times and bar average prices
+# (average of open and close, same as prep_data)
+def day_prices(target_stock, day, interval):
+    arrays = load_arrays(target_stock, day, day + timedelta(days=1), interval)
+    times = pd.to_datetime(arrays[0].astype(np.int64), unit='s', utc=True).tz_convert(market_timezone)
+    return [times.tz_localize(None).values, (arrays[1] + arrays[2]) / 2]
+
+
+# replay one trading day for a watchlist (same format as live_engine.watchlist) through the live engine
+# prices are checked once per bar, from the first bar of the day through the last one (the trading window is set to
+# end one bar after the last, so the last bar's check still runs)
+# provide: watchlist entries, day to replay, bar interval (defaults to 1 minute bars), starting cash, quiet
+#           (hide the order/summary output the live engine prints) and journal (tick_journal.TickJournal to record
+#           the replayed price checks and orders in, None to skip)
+# returns: list with the positions (trading_logic state, including daily totals) and the simulated broker
+def replay_day(entries, day, interval='1m', cash=1000, quiet=True, journal=None):
+    prices = {entry['target_stock']: day_prices(entry['target_stock'], day, interval) for entry in entries}
+    bar_times = [times for times, values in prices.values() if len(times) > 0]
+    positions = positions_from_watchlist(entries, day, interval=interval)
+    if len(bar_times) == 0:
+        return [positions, None]
+
+    step = interval_seconds[interval]
+    first_bar = pd.Timestamp(min(times[0] for times in bar_times)).to_pydatetime()
+    last_bar = pd.Timestamp(max(times[-1] for times in bar_times)).to_pydatetime()
+    prices = {symbol: value for symbol, value in prices.items() if len(value[0]) > 0}
+    positions = [position for position in positions if position['symbol'] in prices]
+
+    clock = ReplayClock(first_bar)
+    broker = SimulatedBroker(clock, prices, cash)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull) if quiet else nullcontext():
+        asyncio.run(run_engine(positions, broker, first_bar - timedelta(seconds=step),
+                               last_bar + timedelta(seconds=step), step, clock, journal=journal))
+    return [positions, broker]
+
+
+# replay every trading day in a date range and collect each stock's daily totals
+# provide: watchlist entries, start_date and end_date (end date is exclusive), bar interval, starting cash per day
+# returns: dataframe with one row per stock per day
+def replay_days(entries, start_date, end_date, interval='1m', cash=1000):
+    rows = list()
+    for day in sessions_between(start_date, end_date):
+        positions, broker = replay_day(entries, day, interval, cash)
+        if broker is not None:
+            for position in positions:
+                rows.append([position['symbol'], day, position['bought'], position['sold'],
+                             position['transactions'], position['profit'],
+                             position['stock_amount'] if position['action'] == 'sell' else 0])
+    return pd.DataFrame(rows, columns=['ticker', 'date', 'bought', 'sold', 'count', 'profit', 'holding'])
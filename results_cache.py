@@ -0,0 +1,121 @@
+# This file remembers the results of the per-day tests (full_check and analyze_stock_alternate in testing.py) on disk
+# A day that's over can never change, so once a day has been tested with a given stock and settings the result is
+# saved and handed back straight away the next time (test_x_days, test_alternate, daily reports over the last 30
+# days...), only new days or new settings are actually worked out.
+# Each result is saved along with a version of the data it came from (the bar store files it used, see bar_cache.py),
+# so if those bars are ever pulled again the result is worked out again.  The least recently used results are dropped
+# once the store holds more than max_entries.
+
+import json
+import os
+import sqlite3
+import zlib
+from time import time
+import bar_cache
+
+# file the results are stored in, can be overridden with the ROBINHOOD_BOT_RESULTS environment variable
+results_file = os.environ.get('ROBINHOOD_BOT_RESULTS',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results_cache.sqlite'))
+
+# most results kept, the least recently used are dropped past this
+max_entries = 200000
+
+# change this whenever the buy/sell logic changes, so results worked out by the old logic aren't reused
+logic_version = 1
+
+# results are checked against max_entries every this many saves
+evict_every = 256
+
+connection = None
+connection_pid = None
+saves = 0
+
+
+# point the store at a different file, or None to turn caching off
+def set_results_file(path):
+    global results_file, connection
+    if connection is not None:
+        connection.close()
+    results_file = path
+    connection = None
+
+
+def connect():
+    global connection, connection_pid
+    # worker processes each open their own connection
+    if connection is None or connection_pid != os.getpid():
+        connection = sqlite3.connect(results_file, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version TEXT, result TEXT, '
+                           'last_used REAL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        connection_pid = os.getpid()
+    return connection
+
+
+# version of the stored bars a result depends on, made from the size and modified time of each day's file
+# returns: version string, or None if any of the days isn't stored yet or isn't over (those results aren't saved)
+def data_version(target_stock, interval, days):
+    today = bar_cache.market_today()
+    stamps = [str(logic_version)]
+    for day in days:
+        path = bar_cache.day_path(target_stock, interval, day)
+        if day >= today or not os.path.exists(path):
+            return None
+        details = os.stat(path)
+        stamps.append(f'{details.st_size}:{details.st_mtime_ns}')
+    return f'{zlib.crc32(" ".join(stamps).encode()):08x}'
+
+
+# look up a saved result
+# returns: the result, or None if there isn't one for this version of the data
+def get(key, version):
+    database = connect()
+    row = database.execute('SELECT result FROM results WHERE key = ? AND version = ?', (key, version)).fetchone()
+    if row is None:
+        return None
+    database.execute('UPDATE results SET last_used = ? WHERE key = ?', (time(), key))
+    database.commit()
+    return json.loads(row[0])
+
+
+# save a result, dropping the least recently used results if the store is over max_entries
+def put(key, version, result):
+    global saves
+    database = connect()
+    database.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, version, json.dumps(result), time()))
+    saves = saves + 1
+    if saves % evict_every == 0:
+        evict()
+    database.commit()
+
+
+def evict():
+    database = connect()
+    extra = database.execute('SELECT COUNT(*) FROM results').fetchone()[0] - max_entries
+    if extra > 0:
+        database.execute('DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)',
+                         (extra,))
+        database.commit()
+
+
+# hand back the saved result for a test, or work it out and save it
+# provide: strategy (name of the test, e.g. 'full_check'), target_stock, day tested, settings (list of the other
+#           inputs, e.g. [std_use, spend]), interval and days (bar interval and every day of bars the test uses),
+#           and compute (function that works the result out)
+# returns: the result (list of bought, sold, count, profit, holding)
+def cached_result(strategy, target_stock, day, settings, interval, days, compute):
+    if results_file is None:
+        return compute()
+    key = json.dumps([strategy, target_stock.upper(), day.isoformat(), settings])
+    version = data_version(target_stock, interval, days)
+    if version is not None:
+        result = get(key, version)
+        if result is not None:
+            return result
+    result = compute()
+    version = data_version(target_stock, interval, days)
+    if version is not None:
+        put(key, version, [float(value) if not isinstance(value, int) else value for value in result])
+    return result
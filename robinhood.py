@@ -3,9 +3,15 @@
 # Note that stock will be bought, then sold.  The code will not buy multiple times in a row.
 # Stock remaining at the end of the day (unsold) will be left for the user to decide what to do with it.
 
-import robin_stocks.robinhood as rs
-from time import sleep
+import asyncio
+import sys
 from datetime import datetime
+from live_engine import RobinhoodBroker, run_engine
+from premarket import load_table, startup_points, startup_stats
+from rolling_stats import seed_interval
+from session import log_in, resume_positions
+from tick_journal import TickJournal
+from trading_logic import new_position
 
 # USER INPUTS
 # Change these values
@@ -19,20 +25,42 @@ password = 'Password123'            # Robinhood password
 mfa = '123456'                      # MFA code (if MFA turned on - user will be prompted in terminal if error)
 target_stock = 'MSFT'               # Target stock ticker
 spend = 1                           # Dollar amount you will spend on each purchase (minimum of $1)
+check_interval = 60                 # Seconds between price checks, lined up with the clock (60 = on the minute)
+journal_file = 'robinhood.journal'  # File every price check and order is recorded to (see tick_journal.py), or None
+state_file = 'robinhood_state.json' # File the stock's state is saved to after every price check (for warm starts)
+latency_file = 'robinhood.latency'  # File the day's timings are written to (JSON, see latency.py), or None
+warm_start = False                  # True (or run with --warm-start) to restart mid-day without the confirmation
+                                    # question: reuses the saved login and picks up where the bot left off today
 buy_price = 19.75                   # Target price to purchase stock at
 sell_price = 20.25                  # Target price to sell stock at
+std_use = None                      # Set to a standard deviation factor (e.g. 1) to have buy/sell prices follow the
+                                    # market through the day instead of using the fixed prices above
+points_std = None                   # Set to a standard deviation factor (e.g. 1) to use fixed buy/sell prices that
+                                    # far below/above the recent average (recommend_points) instead of the ones above
+thresholds_file = 'thresholds.npy'  # File written by premarket.py before the open, the prices/history for std_use or
+                                    # points_std come from it so nothing is downloaded at startup (None to download)
 
 # time range is set to 9:05am to 4:55pm; you can change this to whatever trade window you want
 current_time = datetime.now()
 start_time = current_time.replace(hour=9, minute=5, second=0, microsecond=0)
 end_time = current_time.now().replace(hour=16, minute=55, second=0, microsecond=0)
 
+# buy/sell prices from the pre-market file (or a fresh download if the stock isn't in it for today)
+table = load_table(thresholds_file)
+if points_std is not None:
+    buy_price, sell_price = startup_points(table, target_stock, points_std)
+
 # PRE-CHECKS
 # =================================================================================================================
-# Check to make sure the user input is correct
-proceed = None
+# Check to make sure the user input is correct (skipped on a warm start, the inputs were confirmed at first start)
+warm_start = warm_start or '--warm-start' in sys.argv
+proceed = 'yes' if warm_start else None
 while proceed not in ('yes', 'no'):
-    proceed = input(f'You are targeting {target_stock} to be purchased at {buy_price} and sold at {sell_price} in ${spend} increments.  Is this correct (yes or no)? ')
+    if std_use is not None:
+        prices_used = f'at {std_use} standard deviations below/above the rolling average'
+    else:
+        prices_used = f'at {buy_price} and sold at {sell_price}'
+    proceed = input(f'You are targeting {target_stock} to be purchased {prices_used} in ${spend} increments.  Is this correct (yes or no)? ')
     if proceed == 'no':
         exit('The code has ended, adjust your target stock/price info and try again.')
     elif proceed == 'yes':
@@ -48,70 +76,23 @@ if spend < 1:
 
 # PRIMARY CODE
 # =================================================================================================================
-# log in (may prompt you for an MFA if required and if provided code is not valid)
-login = rs.login(username, password, mfa)
-print('Logged in!')
-
-# set default values, wait a minute to let prices shift a little so that we can figure if price is rising or falling
-action = 'buy'
-last_price = float(rs.stocks.get_latest_price(target_stock)[0])
-stock_amount = 0
-profit = 0
-bought = 0
-sold = 0
-transactions = 0
-sleep(60)
-
-# while we are in the time range, execute code
-while start_time < current_time < end_time:
-
-    # check to make sure we still have enough money left to keep buying stuff, otherwise kill it
-    # if we are selling, then we aren't worried about this
-    if action == 'buy':
-        account_info = rs.profiles.load_account_profile()
-        buying_power = float(account_info['buying_power'])
-        if buying_power < spend:
-            print('Your buying power is less than your specified spend amount.  The program will now stop running.')
-            print(f'Target Stock {target_stock} Daily Summary')
-            print(f'Total purchase amount: ${bought}')
-            print(f'Total sell amount: ${sold}')
-            print(f'Resultant profit: ${profit} with {stock_amount} stocks left over.')
-            exit('Your buying power is too low to continue.  Add funds or lower your spend amount before trying again.')
-
-    # pull current price of the target stock and compare to last known price to see if it's rising/falling
-    current_price = float(rs.stocks.get_latest_price(target_stock)[0])
-    if current_price < last_price:
-        path = 'drop'
-    elif current_price > last_price:
-        path = 'rise'
-    else:
-        path = 'hold'
-    last_price = current_price
-
-    # trigger a buy if we are trying to buy, below our buy price, and price has turned to rise
-    if action == 'buy' and path == 'rise' and current_price < buy_price:
-        action = 'sell'
-        last_price = float(rs.stocks.get_latest_price(target_stock)[0])
-        stock_amount = round(spend / last_price, 6)
-        print(rs.orders.order_buy_fractional_by_quantity(target_stock, stock_amount, timeInForce='gfd'))
-        bought = bought + spend
-        print(f'bought {stock_amount} at {current_time} at {current_price}')
-
-    # trigger a sell if we are trying to sell, above our sell price, and price has turned to fall
-    if action == 'sell' and path == 'drop' and current_price > sell_price:
-        action = 'buy'
-        print(rs.orders.order_sell_fractional_by_quantity(target_stock, stock_amount, timeInForce='gfd'))
-        transactions = transactions + 1
-        sold = sold + (stock_amount * current_price)
-        print(f'sold {stock_amount} at {current_time} at {current_price}')
-
-    # wait one minute before checking again
-    sleep(60)
-    current_time = datetime.now()
+# log in (reuses the last session if it hasn't expired, otherwise may prompt you for an MFA if required and if
+# provided code is not valid)
+login = log_in(username, password, mfa)
 
-# summary report at the end of the day
-else:
-    print(f'Target Stock {target_stock} Daily Summary')
-    print(f'Total purchase amount: ${bought}')
-    print(f'Total sell amount: ${sold}')
-    print(f'Resultant profit: ${profit} with {stock_amount} stocks left over.')
+# the first price check only records the price, then every check_interval seconds (lined up with the clock so checks
+# don't drift) the price is compared to the last one to see if it's rising or falling and we buy/sell accordingly
+# (see trading_logic.py for the buy/sell logic)
+# a daily summary report is printed at the end of the day
+# if std_use is set, buy/sell prices follow a rolling average/standard deviation that is updated with every price
+# check (see rolling_stats.py); it's seeded from the last 5 trading days in bars as close as possible to
+# check_interval apart (not the 5 minute bars recommend_points uses) so the window doesn't mix two bar lengths
+stats = startup_stats(table, target_stock, interval=seed_interval(check_interval)) if std_use is not None else None
+position = new_position(target_stock, spend, 'target', buy_price, sell_price, stats,
+                        std_use if std_use is not None else 1)
+if warm_start:
+    resume_positions([position], journal_file=journal_file, state_file=state_file,
+                     check_interval=check_interval)
+journal = TickJournal(journal_file) if journal_file else None
+asyncio.run(run_engine([position], RobinhoodBroker(), start_time, end_time, check_interval, journal=journal,
+                       latency_file=latency_file, state_file=state_file))
@@ -0,0 +1,90 @@
+# This file keeps a running average and standard deviation over the most recent prices
+# It's seeded once from historical data (the same data recommend_points uses) and then updated with every price the
+# live code sees, so buy/sell prices can follow the market through the day without downloading anything again.
+# Each update is a constant amount of work (Welford's method, adjusted for a sliding window).
+
+import math
+from collections import deque
+from datetime import date
+from bar_cache import interval_seconds
+from support_functions import date_ranges, prep_data
+
+
+# running mean/standard deviation over the last 'window' prices
+class RollingStats:
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0       # running sum of squared differences from the mean
+        self.updates = 0    # updates since the sums were last recalculated from scratch
+
+    # add a price; once the window is full the oldest price is dropped at the same time
+    def push(self, value):
+        value = float(value)
+        if len(self.values) < self.window:
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean = self.mean + delta / len(self.values)
+            self.m2 = self.m2 + delta * (value - self.mean)
+        else:
+            oldest = self.values.popleft()
+            self.values.append(value)
+            old_mean = self.mean
+            self.mean = old_mean + (value - oldest) / self.window
+            self.m2 = self.m2 + (value - oldest) * (value - self.mean + oldest - old_mean)
+
+        # recalculate from scratch once per window's worth of updates so rounding errors can't build up
+        self.updates = self.updates + 1
+        if self.updates >= self.window:
+            self.recalculate()
+
+    def recalculate(self):
+        self.updates = 0
+        if len(self.values) == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        self.mean = math.fsum(self.values) / len(self.values)
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in self.values)
+
+    # sample standard deviation (same as pandas std), nan until there are at least two prices
+    def std(self):
+        if len(self.values) < 2:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / (len(self.values) - 1))
+
+    # buy/sell prices a factor of standard deviation below/above the average (same as recommend_points)
+    # returns: list of buy price and sell price
+    def thresholds(self, std_use):
+        standard_deviation = self.std() * std_use
+        return [self.mean - standard_deviation, self.mean + standard_deviation]
+
+
+# bar interval closest to the live code's check_interval (seconds between price checks)
+# the history the stats are seeded with should move in the same size steps as the prices the live code pushes
+# afterwards, otherwise the window mixes two bar lengths in one average/standard deviation
+def seed_interval(check_interval):
+    return min(interval_seconds, key=lambda interval: abs(interval_seconds[interval] - check_interval))
+
+
+# seed rolling stats from the same 5 days of history recommend_points uses
+# provide: target_stock (ticker e.g. 'MSFT'), start_date (defaults to today), window (how many prices to keep,
+#           defaults to the number of historical prices pulled) and interval (bar interval of the history, see
+#           seed_interval; defaults to 1 minute bars for checks once a minute)
+# returns: RollingStats holding the most recent historical prices
+def seed_from_history(target_stock, start_date=None, window=None, interval='1m'):
+    date_list = date_ranges(start_date or date.today())
+    prices = prep_data(target_stock, date_list[1], date_list[2], interval)['Average'].dropna().to_numpy()
+    return stats_from_prices(prices, window)
+
+
+# rolling stats holding the most recent of the given prices
+# provide: prices (oldest first) and window (how many prices to keep, defaults to the number of prices given)
+def stats_from_prices(prices, window=None):
+    stats = RollingStats(window or max(len(prices), 2))
+    for price in prices[-stats.window:]:
+        stats.values.append(float(price))
+    stats.recalculate()
+    return stats
@@ -0,0 +1,62 @@
+# This file times the live engine's price checks so they line up with the clock (e.g. on the minute, every minute)
+# Rather than sleeping a fixed amount after each check (which drifts later and later as API calls add up), it sleeps
+# until the next boundary, so the time a check takes doesn't push the next one back.  If a check runs so long that
+# the next boundary has already passed, that boundary is skipped (not run late) and counted as missed.
+
+from datetime import timedelta
+
+
+# next boundary strictly after 'now' for a given period, boundaries are counted from midnight
+# (e.g. a period of 60 seconds gives :00 of every minute, 15 gives :00, :15, :30, :45)
+def next_boundary(now, period):
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (now - midnight).total_seconds()
+    return midnight + timedelta(seconds=(elapsed // period + 1) * period)
+
+
+# works out when each price check should run and waits for it
+# provide: clock (anything with now() and an async sleep(seconds), see live_engine.WallClock), period (seconds
+#           between checks) and grace (how many seconds late a check can start before it's skipped instead,
+#           defaults to a quarter of the period)
+class TickScheduler:
+
+    def __init__(self, clock, period, grace=None):
+        self.clock = clock
+        self.period = period
+        self.grace = period / 4 if grace is None else grace
+        self.next_tick = None
+        self.on_time = 0
+        self.late = 0
+        self.missed = 0
+        self.missed_deadlines = list()
+
+    # wait for the next check time and return it
+    async def wait(self):
+        now = self.clock.now()
+        if self.next_tick is None:
+            self.next_tick = next_boundary(now, self.period)
+        lateness = (now - self.next_tick).total_seconds()
+        if lateness > self.grace:
+            # too late for this check, skip ahead to the next boundary and record what was missed
+            upcoming = next_boundary(now, self.period)
+            skipped = int(round((upcoming - self.next_tick).total_seconds() / self.period))
+            self.missed = self.missed + skipped
+            self.missed_deadlines.append([self.next_tick, lateness, skipped])
+            self.next_tick = upcoming
+            lateness = (now - upcoming).total_seconds()
+        if lateness > 0:
+            self.late = self.late + 1
+        else:
+            self.on_time = self.on_time + 1
+            await self.clock.sleep(-lateness)
+        tick = self.next_tick
+        self.next_tick = tick + timedelta(seconds=self.period)
+        return tick
+
+    # one line report of how well the checks kept to schedule
+    def summary(self):
+        text = f'Price checks: {self.on_time} on time, {self.late} late, {self.missed} missed'
+        if self.missed_deadlines:
+            worst = max(lateness for deadline, lateness, skipped in self.missed_deadlines)
+            text = text + f' (worst overrun {round(worst, 2)} seconds)'
+        return text
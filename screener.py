@@ -0,0 +1,144 @@
+# This file screens a whole list of stocks (hundreds at a time) for how well the primary approach would have done
+# Missing bars for every stock are pulled together in bulk (see bar_cache.prefetch) instead of one download per stock,
+# then each day's prices for all of the stocks are lined up into one 2D array (one row per stock, one column per bar
+# time) so buy/sell prices, signals and profit are worked out for every stock at once
+#
+# run from the terminal:
+#   python screener.py MSFT AAPL AMD --std 1 --spend 100 --days 7
+#   python screener.py --file tickers.txt --top 20     - tickers listed one per line (or separated by spaces)
+
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import bar_cache
+from support_functions import date_ranges
+from sweep import test_days
+from trade_kernel import run_target_strategy_by_row
+
+# columns of the ranked table returned by screen
+screen_columns = ['ticker', 'days', 'bought', 'sold', 'count', 'profit', 'holding', 'profit_days']
+
+
+# time a day starts on the exchange's calendar, in seconds since epoch (the same clock the bar store uses)
+def day_start(day):
+    return pd.Timestamp(day).tz_localize(bar_cache.market_timezone).timestamp()
+
+
+# cut a time range out of one stock's time/open/close arrays
+# provide: arrays, bounds - list of start and end times from day_start (end is exclusive)
+def window(arrays, bounds):
+    positions = np.searchsorted(arrays[0], bounds)
+    return arrays[:, positions[0]:positions[1]]
+
+
+# average price of each bar (halfway between open and close, same as prep_data)
+def averages(arrays):
+    return (arrays[1] + arrays[2]) / 2
+
+
+# stack each stock's prices into rows of one 2D array, padding the end of shorter rows with nan
+# (for working out thresholds, where only the prices matter and not which bar they line up with)
+def history_matrix(windows):
+    matrix = np.full((len(windows), max([arrays.shape[1] for arrays in windows] + [0])), np.nan)
+    for row, arrays in enumerate(windows):
+        matrix[row, :arrays.shape[1]] = averages(arrays)
+    return matrix
+
+
+# line up each stock's prices on the bar times seen across all of the stocks, one row per stock
+# a bar a stock is missing is filled with its last price (what a price check at that time would see), bars before
+# a stock's first bar of the day stay nan, so the signals come out the same as running each stock on its own
+# returns: list with the bar times (seconds since epoch) and the 2D array of prices
+def price_matrix(windows):
+    times = np.unique(np.concatenate([arrays[0] for arrays in windows] + [np.empty(0)]))
+    matrix = np.full((len(windows), len(times)), np.nan)
+    for row, arrays in enumerate(windows):
+        matrix[row, np.searchsorted(times, arrays[0])] = averages(arrays)
+    filled = np.where(np.isnan(matrix), 0, np.arange(len(times)))
+    filled = np.maximum.accumulate(filled, axis=1)
+    return [times, np.take_along_axis(matrix, filled, axis=1)]
+
+
+# buy/sell prices for every row at once, a factor of standard deviation below/above each row's average
+# (same as support_functions.thresholds_from_history); rows with fewer than two prices get nan (never trade)
+# provide: matrix from history_matrix and std_use (factor of standard deviation to use)
+# returns: list of arrays of buy prices and sell prices, one per row
+def thresholds_by_row(matrix, std_use):
+    valid = ~np.isnan(matrix)
+    counts = valid.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline_price = np.where(valid, matrix, 0).sum(axis=1) / counts
+        squares = np.where(valid, (matrix - baseline_price[:, None]) ** 2, 0).sum(axis=1)
+        standard_deviation = np.sqrt(squares / (counts - 1)) * std_use
+    standard_deviation[counts < 2] = np.nan
+    return [baseline_price - standard_deviation, baseline_price + standard_deviation]
+
+
+# run the primary approach for every stock over one day
+# provide: universe (dictionary of ticker -> time/open/close arrays covering the day and its history window),
+#           day to test, std_use and spend
+# returns: list of arrays (one value per stock, in the universe's order) of bought, sold, count, profit, holding,
+#           and whether the stock had any bars that day
+def screen_day(universe, day, std_use, spend):
+    date_list = date_ranges(day)
+    history_bounds = [day_start(date_list[1]), day_start(date_list[2])]
+    test_bounds = [day_start(day), day_start(day + timedelta(days=1))]
+    history = history_matrix([window(arrays, history_bounds) for arrays in universe.values()])
+    buy_prices, sell_prices = thresholds_by_row(history, std_use)
+    test_windows = [window(arrays, test_bounds) for arrays in universe.values()]
+    times, prices = price_matrix(test_windows)
+    traded = np.array([arrays.shape[1] > 0 for arrays in test_windows])
+    if len(times) == 0:
+        return [np.zeros(len(universe)) for n in range(5)] + [traded]
+    return run_target_strategy_by_row(prices, buy_prices, sell_prices, spend) + [traded]
+
+
+# screen a list of stocks with the primary approach over a date range and rank them
+# provide: tickers (list e.g. ['MSFT', 'AAPL', ...]), std_use, spend, start_date and end_date (test days run from
+#           start_date up to but not including end_date) and the bar interval
+# returns: dataframe with one row per stock (see screen_columns), best total profit first
+def screen(tickers, std_use, spend, start_date, end_date, interval='5m'):
+    days = test_days(start_date, end_date)
+    if len(days) == 0 or len(tickers) == 0:
+        return pd.DataFrame(columns=screen_columns)
+    load_start = min(date_ranges(day)[1] for day in days)
+    load_end = max(days) + timedelta(days=1)
+    bar_cache.prefetch(tickers, load_start, load_end, interval)
+    universe = {ticker: bar_cache.load_arrays(ticker, load_start, load_end, interval) for ticker in tickers}
+
+    totals = np.zeros((5, len(tickers)))
+    traded_days = np.zeros(len(tickers), dtype=np.int64)
+    profit_days = np.zeros(len(tickers), dtype=np.int64)
+    for day in days:
+        info = screen_day(universe, day, std_use, spend)
+        totals = totals + np.array(info[:5])
+        traded_days = traded_days + info[5]
+        profit_days = profit_days + (info[3] > 0)
+
+    results = pd.DataFrame({'ticker': list(tickers), 'days': traded_days, 'bought': totals[0], 'sold': totals[1],
+                            'count': totals[2].astype(np.int64), 'profit': totals[3], 'holding': totals[4],
+                            'profit_days': profit_days}, columns=screen_columns)
+    return results.sort_values(['profit', 'count'], ascending=False, ignore_index=True)
+
+
+# read tickers from a text file, separated by spaces, commas or new lines
+def read_tickers(path):
+    with open(path) as input_file:
+        return [ticker.upper() for ticker in input_file.read().replace(',', ' ').split()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rank stocks by how the primary approach would have done.')
+    parser.add_argument('tickers', nargs='*')
+    parser.add_argument('--file', help='text file of tickers to screen')
+    parser.add_argument('--std', type=float, default=1, help='factor of standard deviation for buy/sell prices')
+    parser.add_argument('--spend', type=float, default=100, help='dollar amount of each purchase')
+    parser.add_argument('--days', type=int, default=7, help='calendar days to test, counting back from today')
+    parser.add_argument('--top', type=int, default=25, help='how many of the best stocks to show')
+    arguments = parser.parse_args()
+
+    tickers = [ticker.upper() for ticker in arguments.tickers] + (read_tickers(arguments.file) if arguments.file else [])
+    results = screen(list(dict.fromkeys(tickers)), arguments.std, arguments.spend,
+                     date.today() - timedelta(days=arguments.days), date.today())
+    print(results.head(arguments.top).to_string(index=False))
@@ -0,0 +1,113 @@
+# This file lets the live bot get back to trading within seconds when it's restarted during market hours
+# - logging in reuses the session Robinhood handed out last time (saved to disk by robin_stocks), so there's no MFA
+#   round trip until that session expires
+# - each stock's state (whether it's holding, what it paid, the day's totals) is saved to a file after every price
+#   check, and a warm start picks it back up instead of starting the day over
+# - the last price and the rolling average are rebuilt from today's tick journal (plus today's bars for any time the
+#   bot was down), so the first price check after a restart can already buy/sell instead of only recording a price -
+#   unless the latest price found is more than a check_interval old, then the first check only records the price
+
+import json
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+from api_client import default_client
+from bar_cache import load_arrays
+from tick_journal import read_journal, journal_prices
+
+# how long a new Robinhood session lasts (seconds), restarts within this time skip the full login
+session_seconds = 86400
+
+# position values saved to the state file and restored on a warm start (buy/sell prices aren't saved, they come
+# from the user inputs or are rebuilt from the rolling average)
+saved_keys = ('action', 'active', 'stock_amount', 'cost', 'target_price', 'bought', 'sold', 'profit',
+              'transactions', 'pending')
+
+
+# log in to Robinhood, reusing the saved session if it's still good (only asks for MFA if it has to log in again)
+# goes through the shared API client (see api_client.py) like every other call to Robinhood
+# provide: username, password, mfa code and session_name (keeps separate saved sessions apart for several accounts)
+def log_in(username, password, mfa, session_name=''):
+    login = default_client().log_in(username, password, mfa, session_name, session_seconds)
+    print('Logged in!')
+    return login
+
+
+# write every position's state to a file (written to a temp file first, so a crash never leaves half a file)
+# provide: path of the state file, positions (list from trading_logic.new_position), now (time of the save)
+def save_positions(path, positions, now):
+    state = {'date': now.date().isoformat(),
+             'positions': [{'symbol': position['symbol'], 'strategy': position['strategy'],
+                            **{key: position[key] for key in saved_keys}} for position in positions]}
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as output_file:
+        json.dump(state, output_file, indent=2)
+    os.replace(temp_path, path)
+
+
+# read saved position states back, only if they were saved on the given day (yesterday's state is never reused)
+# returns: dictionary of (symbol, strategy) -> saved values, empty if there's nothing to pick up
+def load_positions(path, day):
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as input_file:
+        state = json.load(input_file)
+    if state.get('date') != day.isoformat():
+        return {}
+    return {(saved['symbol'], saved['strategy']): saved for saved in state['positions']}
+
+
+# prices seen so far today for a stock, oldest first
+# the tick journal has every price the bot actually checked; today's 1 minute bars fill in everything after the last
+# journal record (the time the bot was down), or the whole day if the journal has nothing for today
+# provide: target_stock, day, journal_file (None to go straight to the bars)
+# returns: list of times (seconds since epoch; a bar counts from when it closed) and prices, as numpy arrays
+def recent_prices(target_stock, day, journal_file=None):
+    times = np.empty(0)
+    prices = np.empty(0)
+    if journal_file is not None:
+        journal_times, journal_values = journal_prices(read_journal(journal_file), target_stock)
+        today = (journal_times >= datetime.combine(day, datetime.min.time()).timestamp()) & ~np.isnan(journal_values)
+        times = np.asarray(journal_times[today], dtype=np.float64)
+        prices = np.asarray(journal_values[today], dtype=np.float64)
+    arrays = load_arrays(target_stock, day, day + timedelta(days=1), '1m')
+    bar_times = arrays[0] + 60
+    later = bar_times > (times[-1] if len(times) > 0 else -np.inf)
+    return [np.concatenate([times, bar_times[later]]), np.concatenate([prices, ((arrays[1] + arrays[2]) / 2)[later]])]
+
+
+# pick up where the bot left off today: restore each stock's saved state, and its last price and rolling average
+# so it doesn't have to wait a whole check_interval for a second price before it can trade
+# the last price is only restored if it's at most check_interval seconds old - after a long outage the first check
+# would otherwise compare against a price from hours ago and could buy/sell straight away
+# provide: positions (list from trading_logic.new_position), day (defaults to today), journal_file and state_file
+#           (files the engine was writing to before the restart, None to skip either), check_interval and now
+#           (defaults to the current time)
+# returns: the positions, updated in place
+def resume_positions(positions, day=None, journal_file=None, state_file=None, check_interval=60, now=None):
+    day = day or date.today()
+    now = now or datetime.now()
+    saved_positions = load_positions(state_file, day)
+    for position in positions:
+        saved = saved_positions.get((position['symbol'], position['strategy']))
+        if saved is not None:
+            if saved['pending']:
+                print(f'An order for {position["symbol"]} was still open when the bot stopped, check Robinhood to '
+                      f'make sure it went through.')
+            for key in saved_keys:
+                if key != 'pending':
+                    position[key] = saved[key]
+
+        times, prices = recent_prices(position['symbol'], day, journal_file)
+        if position['stats'] is not None:
+            for price in prices:
+                position['stats'].push(float(price))
+            position['buy_price'], position['sell_price'] = position['stats'].thresholds(position['std_use'])
+        if len(prices) > 0 and now.timestamp() - times[-1] <= check_interval:
+            position['last_price'] = float(prices[-1])
+        elif len(prices) > 0:
+            print(f'Latest price for {position["symbol"]} is {round((now.timestamp() - times[-1]) / 60)} minutes old, '
+                  f'the first price check will only record the price.')
+        print(f'Warm start for {position["symbol"]}: looking to {position["action"]}, last price '
+              f'{position["last_price"]}, {position["transactions"]} transactions so far today.')
+    return positions
@@ -0,0 +1,116 @@
+# This file runs a strategy over years of 1 minute bars as one continuous stretch of trading, in flat memory
+# Bars are read from the bar store one chunk of trading days at a time (memory-mapped, see bar_cache.py) and only the
+# current chunk is ever held in memory.  The strategy's state (the last couple of prices, whether it's holding, what
+# it paid, and the running totals) is carried from one chunk to the next, so the result is exactly the same as
+# running the strategy over every bar at once - stock held at the end of one day is simply carried into the next.
+
+from datetime import timedelta
+import numpy as np
+import bar_cache
+from trade_kernel import target_signals, dip_peak_signals, alternate_trades, profitable_trades
+from trading_calendar import sessions_between
+
+
+# read a stock's average bar prices over a date range, one chunk of trading days at a time
+# provide: target_stock, start_date and end_date (end date is exclusive), bar interval and chunk_sessions (trading
+#           days per chunk; each chunk's missing bars are pulled in a single request)
+# yields: numpy array of prices for each chunk (chunks without any bars are skipped)
+def stream_prices(target_stock, start_date, end_date, interval='1m', chunk_sessions=1):
+    days = sessions_between(start_date, end_date)
+    for n in range(0, len(days), chunk_sessions):
+        arrays = bar_cache.load_arrays(target_stock, days[n], days[min(n + chunk_sessions, len(days)) - 1] +
+                                       timedelta(days=1), interval)
+        if arrays.shape[1] > 0:
+            yield (arrays[1] + arrays[2]) / 2
+
+
+# set up the state carried from chunk to chunk
+# provide: strategy ('target' or 'dip'), spend (dollar amount of each purchase), buy_price and sell_price (target
+#           prices, only used by the 'target' approach)
+# returns: dictionary holding the strategy settings, the last prices seen, what's held and the running totals
+def new_stream_state(strategy, spend, buy_price=0, sell_price=0):
+    return {'strategy': strategy,
+            'spend': spend,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'tail': np.empty(0),
+            'holding_price': None,
+            'holding_amount': 0,
+            'bought': 0.0,
+            'sold': 0.0,
+            'count': 0}
+
+
+# add values to a running total one at a time (same order and result as summarize_trades)
+def running_total(total, values):
+    if len(values) == 0:
+        return total
+    return float(np.cumsum(np.concatenate([[total], values]))[-1])
+
+
+# run the strategy over the next chunk of prices and update the state
+# the last two prices of the previous chunk are put in front of this one, so rises/drops/dips/peaks at the start of
+# the chunk come out the same as if there were no break
+# provide: state from new_stream_state and prices - numpy array of the chunk's prices
+def run_chunk(state, prices):
+    carried = len(state['tail'])
+    joined = np.concatenate([state['tail'], prices])
+    holding = state['holding_price'] is not None
+    if state['strategy'] == 'target':
+        buy, sell = target_signals(joined, state['buy_price'], state['sell_price'])
+        buy[:carried] = False
+        sell[:carried] = False
+        buys, sells = alternate_trades(buy, sell, holding)
+    else:
+        buy, sell = dip_peak_signals(joined)
+        buy[:carried] = False
+        sell[:carried] = False
+        buys, sells = profitable_trades(buy, sell, joined, state['holding_price'])
+
+    # each sell goes with the buy right before it (the first sell goes with the stock held coming in, if any)
+    buy_prices = joined[buys]
+    amounts = state['spend'] / buy_prices
+    if holding:
+        amounts = np.concatenate([[state['holding_amount']], amounts])
+    state['bought'] = running_total(state['bought'], np.full(len(buys), state['spend'], dtype=np.float64))
+    state['sold'] = running_total(state['sold'], amounts[:len(sells)] * joined[sells])
+    state['count'] = state['count'] + len(sells)
+    if len(amounts) > len(sells):
+        state['holding_amount'] = amounts[-1]
+        state['holding_price'] = buy_prices[-1] if len(buy_prices) > 0 else state['holding_price']
+    else:
+        state['holding_amount'] = 0
+        state['holding_price'] = None
+    state['tail'] = joined[-2:].copy()
+
+
+# totals once every chunk has been run
+# if we are still holding at the end, sell at the last price as long as it's for any profit (same as trade_record)
+# returns: bought, sold, count (count of full buy/sell transactions), profit, holding (see summarize_trades)
+def finish_stream(state):
+    bought = state['bought']
+    sold = state['sold']
+    count = state['count']
+    if state['holding_price'] is not None and len(state['tail']) > 0 and state['holding_price'] < state['tail'][-1]:
+        sold = running_total(sold, [state['holding_amount'] * state['tail'][-1]])
+        count = count + 1
+    profit = sold - bought
+    if (count * state['spend']) < bought:
+        holding = float(state['holding_amount'])
+        profit = profit + state['spend']
+    else:
+        holding = 0
+    return [bought, sold, count, profit, holding]
+
+
+# run a strategy over a long date range of bars as one continuous stretch of trading, in flat memory
+# provide: target_stock, strategy ('target' or 'dip'), spend, start_date and end_date (end date is exclusive),
+#           buy_price and sell_price (for the 'target' approach), bar interval and chunk_sessions (trading days
+#           loaded at a time)
+# returns: bought, sold, count, profit, holding (see summarize_trades)
+def stream_backtest(target_stock, strategy, spend, start_date, end_date, buy_price=0, sell_price=0, interval='1m',
+                    chunk_sessions=1):
+    state = new_stream_state(strategy, spend, buy_price, sell_price)
+    for prices in stream_prices(target_stock, start_date, end_date, interval, chunk_sessions):
+        run_chunk(state, prices)
+    return finish_stream(state)
@@ -1,45 +1,54 @@
 # This code is primarily support functions intended to help the user and to assist other functions
 
-import yfinance as yf
-from datetime import timedelta
+import pandas as pd
+from bar_cache import load_bars
+from trading_calendar import history_window, test_window
 
 
-# set the date ranges to focus on 5 weekdays, based on a given input
+# set the date ranges to focus on 5 trading days, based on a given input
 # the test data will be from the input date forward, historical data will be from the input date backwards
+# days the market is closed (weekends and holidays) are skipped, see trading_calendar.py
 # provide: start_date - use the date function from datetime
-# returns: list with end_date (five business days from start), hist_start and hist_end (historical data start/end dates)
+# returns: list with end_date (five trading days from start), hist_start and hist_end (historical data start/end dates)
 def date_ranges(start_date):
-    if start_date.weekday() == 0:
-        end_date = start_date + timedelta(days=5)
-        hist_end = start_date - timedelta(days=2)
-        hist_start = start_date - timedelta(days=8)
-    elif start_date.weekday() == 5:
-        end_date = start_date + timedelta(days=7)
-        hist_end = start_date
-        hist_start = start_date - timedelta(days=5)
-    elif start_date.weekday() == 6:
-        end_date = start_date + timedelta(days=6)
-        hist_end = start_date - timedelta(days=1)
-        hist_start = start_date - timedelta(days=7)
-    else:
-        end_date = start_date + timedelta(days=7)
-        hist_end = start_date
-        hist_start = start_date - timedelta(days=7)
+    end_date = test_window(start_date)[1]
+    hist_start, hist_end = history_window(start_date)
     return [end_date, hist_start, hist_end]
 
 
 # prepare historical data from stock listing
-# pull the target stock's data over five minute intervals for a given date range
+# pull the target stock's data over five minute intervals (or another bar interval) for a given date range
+# bars come from the local bar store in bar_cache.py, only days that haven't been pulled before are downloaded
 # add a column for 'average' of that 5 minute interval based on the open and close price and remove extra columns
-# provide: target_stock (provide the ticker, e.g. 'MSFT'), start_date and end_date to pull data for
+# provide: target_stock (provide the ticker, e.g. 'MSFT'), start_date and end_date to pull data for,
+#           and optionally the bar interval (defaults to '5m')
 # return: prepped_data pulled from yahoo finance at 5 minute intervals for a date range, with prices averaged out
-def prep_data(target_stock, start_date, end_date):
-    prepped_data = yf.Ticker(target_stock).history(interval='5m', start=start_date, end=end_date)
-    prepped_data = prepped_data[['Open', 'Close']]
+def prep_data(target_stock, start_date, end_date, interval='5m'):
+    prepped_data = load_bars(target_stock, start_date, end_date, interval)
     prepped_data['Average'] = (prepped_data['Open'] + prepped_data['Close']) / 2
     return prepped_data
 
 
+# cut a date range out of data that was already pulled with prep_data (so one download can serve many windows)
+# provide: data from prep_data, start_date and end_date (end date is exclusive, same as prep_data)
+# returns: the rows of data that fall on or after start_date and before end_date
+def slice_dates(data, start_date, end_date):
+    bounds = [pd.Timestamp(start_date).tz_localize(data.index.tz), pd.Timestamp(end_date).tz_localize(data.index.tz)]
+    positions = data.index.searchsorted(bounds)
+    return data.iloc[positions[0]:positions[1]]
+
+
+# work out buy/sell prices from historical data, a factor of standard deviation below/above the average price
+# provide: historical_data from prep_data and std_use (factor of standard deviation to use)
+# returns: list of recommended purchase price and sell price
+def thresholds_from_history(historical_data, std_use):
+    baseline_price = historical_data['Average'].mean()
+    standard_deviation = historical_data['Average'].std()*std_use
+    buy_price = baseline_price - standard_deviation
+    sell_price = baseline_price + standard_deviation
+    return [buy_price, sell_price]
+
+
 # recommend target sell/buy prices for a stock based on standard deviation from average over a given date range
 # you can use a factor for std deviation other than 1 (ex target .8 of a std deviation instead of 1)
 # provide: target_stock (ticker e.g. 'MSFT'), start_date to use as a starting point to pull historical data,
@@ -52,11 +61,7 @@ def recommend_points(target_stock, start_date, std_use):
 
     # pull historical data for last 5 days at 5 minute increments, determine recommended sell/buy price
     historical_data = prep_data(target_stock, hist_start, hist_end)
-    baseline_price = historical_data['Average'].mean()
-    standard_deviation = historical_data['Average'].std()*std_use
-    buy_price = baseline_price - standard_deviation
-    sell_price = baseline_price + standard_deviation
-    return [buy_price, sell_price]
+    return thresholds_from_history(historical_data, std_use)
 
 
 # recommend target sell/buy points for a stock based on only one day of data as opposed to five days
@@ -65,16 +70,9 @@ def recommend_points(target_stock, start_date, std_use):
 #           and std_use to provide a factor of standard deviation to use to determine prices
 # returns: list of recommended purchse price and sell price
 def recommend_points_one_day(target_stock, start_date, std_use):
-    # pull the prior business day based on the provided start date
-    if start_date.weekday() == 0:
-        hist_start = start_date - timedelta(days=3)
-    else:
-        hist_start = start_date - timedelta(days=1)
+    # pull the prior trading day based on the provided start date
+    hist_start, hist_end = history_window(start_date, 1)
 
     # pull historical data for last day at 5 minute increments, determine recommended sell/buy price
-    historical_data = prep_data(target_stock, hist_start, start_date)
-    baseline_price = historical_data['Average'].mean()
-    standard_deviation = historical_data['Average'].std()*std_use
-    buy_price = baseline_price - standard_deviation
-    sell_price = baseline_price + standard_deviation
-    return [buy_price, sell_price]
+    historical_data = prep_data(target_stock, hist_start, hist_end)
+    return thresholds_from_history(historical_data, std_use)
@@ -0,0 +1,95 @@
+# This file runs the primary approach test (full_check in testing.py) over many combinations at once
+# Give it a list of stocks, a list of standard deviation factors and a list of spend amounts, and it will test every
+# combination over a date range, spread across all CPU cores, and hand back a table of results instead of printing
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+import bar_cache
+from support_functions import date_ranges, prep_data, slice_dates, thresholds_from_history
+from trade_kernel import target_signals, alternate_trades, trade_record, summarize_trades
+from trading_calendar import sessions_between
+
+# columns of the results table returned by sweep
+result_columns = ['ticker', 'date', 'std_use', 'spend', 'buy_price', 'sell_price',
+                  'bought', 'sold', 'count', 'profit', 'holding']
+
+
+# list the trading days from start_date up to (but not including) end_date, these are the days that get tested
+def test_days(start_date, end_date):
+    return sessions_between(start_date, end_date)
+
+
+# worker processes use the same bar store and fetcher as the process that started the sweep
+def init_worker(cache_dir, fetcher):
+    bar_cache.set_cache_dir(cache_dir)
+    bar_cache.set_fetcher(fetcher)
+
+
+# pull every bar a ticker needs for the given test days once, so the bar store has them before testing starts
+def load_ticker(target_stock, days):
+    prep_data(target_stock, min(date_ranges(day)[1] for day in days), max(days) + timedelta(days=1))
+    return target_stock
+
+
+# test a group of days for one ticker across every std_use/spend combination
+# bars for the whole group are loaded once, then each day's history/test window is cut out of them
+# the trades only depend on the buy/sell prices, so they are worked out once per std_use and reused for each spend
+# returns: list of result rows (see result_columns)
+def sweep_days(target_stock, days, std_uses, spends):
+    data = prep_data(target_stock, min(date_ranges(day)[1] for day in days), max(days) + timedelta(days=1))
+    rows = list()
+    for day in days:
+        date_list = date_ranges(day)
+        historical_data = slice_dates(data, date_list[1], date_list[2])
+        prices = slice_dates(data, day, day + timedelta(days=1))['Average'].to_numpy(dtype=np.float64)
+        for std_use in std_uses:
+            buy_price, sell_price = thresholds_from_history(historical_data, std_use)
+            buy, sell = target_signals(prices, buy_price, sell_price)
+            buys, sells = alternate_trades(buy, sell)
+            buy_prices, sell_prices = trade_record(prices, buys, sells)
+            for spend in spends:
+                info = summarize_trades(buy_prices, sell_prices, spend)
+                rows.append([target_stock, day, std_use, spend, buy_price, sell_price] + info)
+    return rows
+
+
+# test every ticker x std_use x spend combination over a date range, in parallel
+# each ticker's bars are downloaded once (one process per ticker), then the test days are split into groups and
+# spread across the process pool
+# provide: tickers (list of tickers e.g. ['MSFT', 'AAPL']), std_uses (list of standard deviation factors),
+#           spends (list of dollar amounts per purchase), start_date and end_date (test days run from start_date up
+#           to but not including end_date), processes (number of processes, defaults to the number of CPUs; use 1
+#           to run everything in this process) and days_per_task (how many days each piece of work covers)
+# returns: dataframe with one row per ticker/day/std_use/spend (see result_columns)
+def sweep(tickers, std_uses, spends, start_date, end_date, processes=None, days_per_task=5):
+    days = test_days(start_date, end_date)
+    if len(days) == 0:
+        return pd.DataFrame(columns=result_columns)
+    chunks = [days[n:n + days_per_task] for n in range(0, len(days), days_per_task)]
+
+    rows = list()
+    if processes == 1:
+        for ticker in tickers:
+            for chunk in chunks:
+                rows.extend(sweep_days(ticker, chunk, std_uses, spends))
+    else:
+        with ProcessPoolExecutor(max_workers=processes or os.cpu_count(), initializer=init_worker,
+                                 initargs=(bar_cache.cache_dir, bar_cache.fetcher)) as pool:
+            list(pool.map(load_ticker, tickers, [days] * len(tickers)))
+            jobs = [pool.submit(sweep_days, ticker, chunk, std_uses, spends) for ticker in tickers for chunk in chunks]
+            for job in jobs:
+                rows.extend(job.result())
+
+    return pd.DataFrame(rows, columns=result_columns)
+
+
+# total up sweep results for each ticker/std_use/spend combination, best total profit first
+# provide: results from sweep
+# returns: dataframe with total bought/sold/count/profit/holding per combination
+def summarize_sweep(results):
+    totals = results.groupby(['ticker', 'std_use', 'spend'], as_index=False)[
+        ['bought', 'sold', 'count', 'profit', 'holding']].sum()
+    return totals.sort_values('profit', ascending=False, ignore_index=True)
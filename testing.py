@@ -2,8 +2,10 @@
 
 from datetime import timedelta, date
 import numpy as np
-import yfinance as yf
-from support_functions import prep_data, recommend_points
+from results_cache import cached_result
+from support_functions import date_ranges, prep_data, recommend_points
+from trade_kernel import run_target_strategy, run_dip_strategy
+from trading_calendar import is_session, sessions_between
 
 
 # ORIGINAL TEST FUNCTIONS to help determine if a stock might be a good option
@@ -20,85 +22,32 @@ from support_functions import prep_data, recommend_points
 def analyze_stock(target_stock, start_date, buy_price, sell_price, spend):
     end_date = start_date + timedelta(days=1)
 
-    # break out the data set into factors to help determine when to buy and when to sell
+    # pull the day's prices and run them through the shared buy/sell logic in trade_kernel.py
     test_data = prep_data(target_stock, start_date, end_date)
-    test_data['Buy'] = np.where(test_data['Average'] <= buy_price, 'buy', '')
-    test_data['Sell'] = np.where(test_data['Average'] >= sell_price, 'sell', '')
-    test_data['shifted'] = test_data['Average'].shift(1)
-    test_data['Rise'] = np.where(test_data['shifted'] < test_data['Average'], 'rise', '')
-    test_data['Drop'] = np.where(test_data['shifted'] > test_data['Average'], 'drop', '')
-    test_data['Actual Buy'] = np.where((test_data['Rise'] == 'rise') & (test_data['Buy'] == 'buy'),
-                                       test_data['Average'], '0')
-    test_data['Actual Sell'] = np.where((test_data['Drop'] == 'drop') & (test_data['Sell'] == 'sell'),
-                                        test_data['Average'], '0')
-
-    # create a record of actual purchase/sell points
-    flag = 'buy'
-    flag_column = 'Actual Buy'
-    record = list()
-    for index, row in test_data.iterrows():
-        if float(row[flag_column]) > 0:
-            record.append([row[flag_column], flag])
-            if flag == 'buy':
-                flag = 'sell'
-                flag_column = 'Actual Sell'
-            else:
-                flag = 'buy'
-                flag_column = 'Actual Buy'
-
-    # if we bought something, check the end of day close price to see if we should sell it
-    if len(record) != 0:
-        if flag == 'sell':
-            bought_at = float(record[int(len(record) - 1)][0])
-            close_price = float(test_data['Average'].iat[-1])
-            if bought_at < close_price:
-                record.append([close_price, 'sell'])
-
-    # if record is empty, no buys made so no buy/sell data to report
-    # otherwise, figure out buy/sell/profit data
-    if len(record) == 0:
-        bought = 0
-        sold = 0
-        count = 0
-        profit = 0
-        holding = 0
-    else:
-        bought = 0
-        sold = 0
-        count = 0
-        percent_holding = 0
-        for item in range(len(record)):
-            if record[item][1] == 'buy':
-                bought = bought + spend
-                percent_holding = spend / float(record[item][0])
-            elif record[item][1] == 'sell':
-                sold = sold + (percent_holding * float(record[item][0]))
-                count = count + 1
-
-        profit = sold - bought
-        if (count * spend) < bought:
-            holding = percent_holding
-            profit = profit + spend
-        else:
-            holding = 0
-
-    return [bought, sold, count, profit, holding]
+    prices = test_data['Average'].to_numpy(dtype=np.float64)
+    return run_target_strategy(prices, buy_price, sell_price, spend)
 
 
 # for a given stock, pull its recommend prices and use those to analyze the stock using analyze_stock
 # user provides the start date, target stock, spend amount, and standard deviation factor
 # returns the listed info from analyze_stock function
+# results for days that are over are saved and reused the next time (see results_cache.py)
 def full_check(start_date, target_stock, std_use, max_spend):
-    prices = recommend_points(target_stock, start_date, std_use)
-    info = analyze_stock(target_stock, start_date, prices[0], prices[1], max_spend)
-    return info
+    def check():
+        prices = recommend_points(target_stock, start_date, std_use)
+        return analyze_stock(target_stock, start_date, prices[0], prices[1], max_spend)
+
+    hist_start, hist_end = date_ranges(start_date)[1:]
+    days = sessions_between(hist_start, hist_end) + [start_date]
+    return cached_result('full_check', target_stock, start_date, [std_use, max_spend], '5m', days, check)
 
 
 # analyze a stock using full_check for the last 'x' days
 # this will run a series of checks on the target stock for the past 'x' days to get a range of reference data
 # the totals bought/sold/transactions/profit/stock remaining will be displayed at the end
-def test_x_days(target_stock, std_use, max_spend, day_count):
-    start_date = date.today()
+# end_date moves the 'x' days to the days before a different date than today
+def test_x_days(target_stock, std_use, max_spend, day_count, end_date=None):
+    start_date = end_date or date.today()
     bought = 0
     sold = 0
     profit = 0
@@ -106,7 +55,7 @@ def test_x_days(target_stock, std_use, max_spend, day_count):
     holding = 0
     for n in list(range(0, day_count)):
         start_date = start_date - timedelta(days=1)
-        if not start_date.weekday() == 5 and not start_date.weekday() == 6:
+        if is_session(start_date):
             info = full_check(start_date, target_stock, std_use, max_spend)
             bought = bought + info[0]
             sold = sold + info[1]
@@ -127,85 +76,20 @@ def test_x_days(target_stock, std_use, max_spend, day_count):
 def analyze_stock_alternate(target_stock, start_date, spend):
     end_date = start_date + timedelta(days=1)
 
-    # pull and prep the data
-    test_data = yf.Ticker(target_stock).history(interval='1m', start=start_date, end=end_date)
-    test_data = test_data[['Open', 'Close']]
-    test_data['Average'] = (test_data['Open'] + test_data['Close']) / 2
-
-    # break out the data set into factors to help determine when to buy and when to sell
-    test_data['shifted'] = test_data['Average'].shift(1)
-    test_data['Rise'] = np.where(test_data['shifted'] < test_data['Average'], 'rise', '')
-    test_data['Drop'] = np.where(test_data['shifted'] > test_data['Average'], 'drop', '')
-    test_data['combine'] = test_data['Rise'] + test_data['Drop']
-    test_data['shift_combine'] = test_data['combine'].shift(1)
-    test_data['Buy'] = np.where((test_data['combine'] == 'rise') & (test_data['shift_combine'] == 'drop'), 'buy', '')
-    test_data['Sell'] = np.where((test_data['combine'] == 'drop') & (test_data['shift_combine'] == 'rise'), 'sell', '')
-    test_data['Actual Buy'] = np.where((test_data['Rise'] == 'rise') & (test_data['Buy'] == 'buy'),
-                                       test_data['Average'], '0')
-    test_data['Actual Sell'] = np.where((test_data['Drop'] == 'drop') & (test_data['Sell'] == 'sell'),
-                                        test_data['Average'], '0')
-
-    # create a record of actual purchase/sell points
+    # pull the day's prices and run them through the shared buy/sell logic in trade_kernel.py
     # note that for testing purposes we double-check prices to make sure we are profiting off each transaction
-    flag = 'buy'
-    flag_column = 'Actual Buy'
-    target_price = 1000000
-    record = list()
-    for index, row in test_data.iterrows():
-        if float(row[flag_column]) > 0:
-            if flag == 'buy':
-                record.append([row[flag_column], flag])
-                target_price = float(row['Average'])
-                flag = 'sell'
-                flag_column = 'Actual Sell'
-            elif flag == 'sell':
-                if float(row['Average'] > target_price):
-                    record.append([row[flag_column], flag])
-                    flag = 'buy'
-                    flag_column = 'Actual Buy'
-
-    # if we bought something, check the end of day close price to see if we should sell it
-    if len(record) != 0:
-        if flag == 'sell':
-            bought_at = float(record[int(len(record) - 1)][0])
-            close_price = float(test_data['Average'].iat[-1])
-            if bought_at < close_price:
-                record.append([close_price, 'sell'])
-
-    # if record is empty, no buys made so no buy/sell data to report
-    # otherwise, figure out buy/sell/profit data
-    if len(record) == 0:
-        bought = 0
-        sold = 0
-        count = 0
-        profit = 0
-        holding = 0
-    else:
-        bought = 0
-        sold = 0
-        count = 0
-        percent_holding = 0
-        for item in range(len(record)):
-            if record[item][1] == 'buy':
-                bought = bought + spend
-                percent_holding = spend / float(record[item][0])
-            elif record[item][1] == 'sell':
-                sold = sold + (percent_holding * float(record[item][0]))
-                count = count + 1
-
-        profit = sold - bought
-        if (count * spend) < bought:
-            holding = percent_holding
-            profit = profit + spend
-        else:
-            holding = 0
+    # results for days that are over are saved and reused the next time (see results_cache.py)
+    def check():
+        test_data = prep_data(target_stock, start_date, end_date, interval='1m')
+        prices = test_data['Average'].to_numpy(dtype=np.float64)
+        return run_dip_strategy(prices, spend)
 
-    return [bought, sold, count, profit, holding]
+    return cached_result('analyze_stock_alternate', target_stock, start_date, [spend], '1m', [start_date], check)
 
 
-# Tests the stock using the alternate approach over a number of days
-def test_alternate(target_stock, max_spend, day_count):
-    start_date = date.today()
+# Tests the stock using the alternate approach over a number of days (the ones before end_date, today by default)
+def test_alternate(target_stock, max_spend, day_count, end_date=None):
+    start_date = end_date or date.today()
     bought = 0
     sold = 0
     profit = 0
@@ -213,7 +97,7 @@ def test_alternate(target_stock, max_spend, day_count):
     holding = 0
     for n in list(range(0, day_count)):
         start_date = start_date - timedelta(days=1)
-        if not start_date.weekday() == 5 and not start_date.weekday() == 6:
+        if is_session(start_date):
             info = analyze_stock_alternate(target_stock, start_date, max_spend)
             bought = bought + info[0]
             sold = sold + info[1]
@@ -0,0 +1,55 @@
+import os
+from datetime import date
+import numpy as np
+import pandas as pd
+import bar_cache
+
+days = [date(2025, 6, 2), date(2025, 6, 3), date(2025, 6, 4)]
+
+
+# a few made-up 5 minute bars for each day
+def bars(target_stock, run_days):
+    times = [pd.Timestamp(day).tz_localize(bar_cache.market_timezone) + pd.Timedelta(hours=9, minutes=30 + 5 * n)
+             for day in run_days for n in range(3)]
+    prices = np.arange(len(times), dtype=np.float64) + (1 if target_stock == 'AAA' else 100)
+    return pd.DataFrame({'Open': prices, 'Close': prices}, index=pd.DatetimeIndex(times))
+
+
+def test_prefetch_only_stores_each_tickers_own_missing_days(tmp_path, monkeypatch):
+    monkeypatch.setattr(bar_cache, 'cache_dir', str(tmp_path))
+    monkeypatch.setattr(bar_cache, 'fetcher', None)
+    for day in days:
+        bar_cache.save_day_arrays('AAA', '5m', day, bar_cache.split_days(bars('AAA', [day]))[day])
+    bar_cache.save_day_arrays('BBB', '5m', days[0], bar_cache.split_days(bars('BBB', [days[0]]))[days[0]])
+    os.remove(bar_cache.day_path('AAA', '5m', days[1]))
+    kept = {day: os.stat(bar_cache.day_path('AAA', '5m', day)).st_mtime_ns for day in (days[0], days[2])}
+
+    # the run covers days[1] and days[2] for both tickers, but the response only has AAA's missing day
+    requests = list()
+
+    def bulk_fetcher(tickers, interval, start_date, end_date):
+        requests.append([sorted(tickers), start_date, end_date])
+        return {'AAA': bars('AAA', [days[1]]), 'BBB': bars('BBB', days[1:])}
+
+    monkeypatch.setattr(bar_cache, 'bulk_fetcher', bulk_fetcher)
+    bar_cache.prefetch(['AAA', 'BBB'], days[0], date(2025, 6, 5))
+
+    assert requests == [[['AAA', 'BBB'], days[1], date(2025, 6, 5)]]
+    assert bar_cache.load_arrays('AAA', days[0], date(2025, 6, 5)).shape[1] == 9
+    assert bar_cache.load_arrays('BBB', days[0], date(2025, 6, 5)).shape[1] == 9
+    assert {day: os.stat(bar_cache.day_path('AAA', '5m', day)).st_mtime_ns for day in kept} == kept
+
+
+def test_long_runs_are_split_into_requests_yahoo_accepts(tmp_path, monkeypatch):
+    monkeypatch.setattr(bar_cache, 'cache_dir', str(tmp_path))
+    requests = list()
+
+    def fetcher(target_stock, interval, start_date, end_date):
+        requests.append([start_date, end_date])
+        return bars(target_stock, [start_date])
+
+    monkeypatch.setattr(bar_cache, 'fetcher', fetcher)
+    bar_cache.load_arrays('AAA', date(2025, 6, 2), date(2025, 7, 1), '1m')
+    assert len(requests) > 1
+    assert all((end_date - start_date).days <= bar_cache.max_request_days['1m'] for start_date, end_date in requests)
+    assert requests[0][0] == date(2025, 6, 2) and requests[-1][1] == date(2025, 7, 1)
@@ -0,0 +1,35 @@
+import asyncio
+from datetime import datetime, timedelta
+from order_tracking import track_fill
+
+
+# simulated time: sleeping moves the time forward without waiting
+class FakeClock:
+
+    def __init__(self):
+        self.current_time = datetime(2025, 6, 2, 10, 0)
+
+    def now(self):
+        return self.current_time
+
+    async def sleep(self, seconds):
+        self.current_time = self.current_time + timedelta(seconds=seconds)
+
+
+def test_timeout_follows_the_clock_it_is_given():
+    clock = FakeClock()
+    cancels = list()
+
+    async def get_status():
+        if cancels:
+            return {'state': 'cancelled', 'cumulative_quantity': '0.5', 'average_price': '10'}
+        return {'state': 'queued', 'cumulative_quantity': '0.5', 'average_price': '10'}
+
+    async def cancel():
+        cancels.append(clock.now())
+
+    started = datetime.now()
+    details = asyncio.run(track_fill(get_status, 'order', 1, 120, cancel, clock=clock))
+    assert details == ['cancelled', 0.5, 10.0]
+    assert cancels == [datetime(2025, 6, 2, 10, 2)]
+    assert datetime.now() - started < timedelta(seconds=5)
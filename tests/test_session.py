@@ -0,0 +1,56 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import bar_cache
+from session import resume_positions
+from tick_journal import TickJournal
+from trading_logic import new_position
+
+day = date(2025, 6, 2)
+
+
+def market_time(hour, minute):
+    return pd.Timestamp(day).tz_localize(bar_cache.market_timezone) + pd.Timedelta(hours=hour, minutes=minute)
+
+
+# 1 minute bars from 9:30 to 13:59 at 20 + 0.01 per minute, stored so nothing is downloaded
+def store_bars(monkeypatch, tmp_path):
+    monkeypatch.setattr(bar_cache, 'cache_dir', str(tmp_path / 'bars'))
+    monkeypatch.setattr(bar_cache, 'fetcher', None)
+    times = pd.date_range(market_time(9, 30), market_time(13, 59), freq='1min')
+    prices = 20 + 0.01 * np.arange(len(times))
+    fetched_data = pd.DataFrame({'Open': prices, 'Close': prices}, index=times)
+    bar_cache.save_day_arrays('AAA', '1m', day, bar_cache.split_days(fetched_data)[day])
+    return prices
+
+
+# the bot checked AAA at 10:00 and 10:01, then was down until after 2pm
+def write_journal(tmp_path):
+    journal_file = str(tmp_path / 'test.journal')
+    journal = TickJournal(journal_file)
+    journal.record(market_time(10, 0).timestamp(), 'AAA', 10.0)
+    journal.record(market_time(10, 1).timestamp(), 'AAA', 10.5)
+    journal.close()
+    return journal_file
+
+
+def test_stale_journal_resumes_from_later_bars(tmp_path, monkeypatch):
+    bar_prices = store_bars(monkeypatch, tmp_path)
+    position = new_position('AAA', 100)
+    resume_positions([position], day, write_journal(tmp_path), now=market_time(14, 0).to_pydatetime())
+    assert position['last_price'] == bar_prices[-1]
+
+
+def test_stale_prices_are_not_resumed_as_last_price(tmp_path, monkeypatch):
+    store_bars(monkeypatch, tmp_path)
+    position = new_position('AAA', 100)
+    resume_positions([position], day, write_journal(tmp_path), now=market_time(15, 30).to_pydatetime())
+    assert position['last_price'] is None
+
+
+def test_fresh_journal_is_used_as_is(tmp_path, monkeypatch):
+    store_bars(monkeypatch, tmp_path)
+    monkeypatch.setattr(bar_cache, 'cache_dir', str(tmp_path / 'empty'))
+    position = new_position('AAA', 100)
+    resume_positions([position], day, write_journal(tmp_path), now=market_time(10, 2).to_pydatetime())
+    assert position['last_price'] == 10.5
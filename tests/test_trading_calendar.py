@@ -0,0 +1,21 @@
+from datetime import date, timedelta
+import pytest
+from trading_calendar import history_window, session_before, session_windows, sessions
+
+
+def test_windows_at_the_start_of_the_calendar():
+    fifth_session = sessions[5].astype(date)
+    assert history_window(fifth_session) == [sessions[0].astype(date),
+                                             sessions[4].astype(date) + timedelta(days=1)]
+    assert session_before(fifth_session, 5) == sessions[0].astype(date)
+    assert session_windows(fifth_session, sessions[6].astype(date))[0][1] == sessions[0].astype(date)
+
+
+def test_windows_before_the_start_of_the_calendar_raise():
+    fourth_session = sessions[4].astype(date)
+    with pytest.raises(ValueError):
+        history_window(fourth_session)
+    with pytest.raises(ValueError):
+        session_before(fourth_session, 5)
+    with pytest.raises(ValueError):
+        session_windows(fourth_session, sessions[10].astype(date))
@@ -0,0 +1,93 @@
+# This file records every price the live code checks (and every order it sends) to a file, so the day can be
+# replayed or analyzed later at the real polling resolution
+# Each record is a fixed 64 bytes, appended to the end of the file, so the file can be read straight into a numpy
+# array (memory-mapped, no copying) at any time - including while the bot is still running and writing to it.
+# Records are collected in a fixed-size buffer in memory and written out in batches, so memory stays flat however long
+# the bot runs and writing costs next to nothing per price check.
+
+import os
+import numpy as np
+
+# layout of one record
+record_dtype = np.dtype([('time', '<f8'),          # seconds since epoch
+                         ('price', '<f8'),         # price checked, or fill price for 'filled' records
+                         ('symbol', 'S8'),
+                         ('order_id', 'S36'),      # Robinhood order id, blank for price checks
+                         ('decision', 'i1'),       # see decisions below
+                         ('spare', 'V3')])         # padding to 64 bytes
+
+# decision codes
+decisions = {None: 0, 'buy': 1, 'sell': 2, 'ordered': 3, 'filled': 4, 'failed': 5, 'unconfirmed': 6}
+decision_names = {code: name for name, code in decisions.items()}
+
+
+# appends records to a journal file through a bounded in-memory buffer
+# provide: path of the journal file (appended to if it exists), capacity (records held in memory) and flush_every
+#           (write the buffer out once this many records are waiting, at most capacity)
+class TickJournal:
+
+    def __init__(self, path, capacity=4096, flush_every=1024):
+        self.path = path
+        self.capacity = capacity
+        self.flush_every = min(flush_every, capacity)
+        self.buffer = np.zeros(capacity, dtype=record_dtype)
+        self.count = 0
+        self.flushed = 0
+        self.file = open(path, 'ab')
+        # drop any partial record left at the end of the file by a crash, so records stay lined up
+        extra = os.path.getsize(path) % record_dtype.itemsize
+        if extra:
+            self.file.truncate(os.path.getsize(path) - extra)
+
+    def record(self, time, symbol, price, decision=None, order_id=''):
+        self.buffer[self.count % self.capacity] = (time, price, symbol.encode(), str(order_id or '').encode(),
+                                                   decisions[decision], b'\x00\x00\x00')
+        self.count = self.count + 1
+        if self.count - self.flushed >= self.flush_every:
+            self.flush()
+
+    # write everything that hasn't been written yet to the file
+    def flush(self):
+        if self.count == self.flushed:
+            return
+        start = self.flushed % self.capacity
+        end = self.count % self.capacity
+        if start < end:
+            self.file.write(self.buffer[start:end].tobytes())
+        else:
+            self.file.write(self.buffer[start:].tobytes())
+            self.file.write(self.buffer[:end].tobytes())
+        self.file.flush()
+        self.flushed = self.count
+
+    # most recent records still held in memory (up to capacity), oldest first
+    def recent(self):
+        if self.count <= self.capacity:
+            return self.buffer[:self.count].copy()
+        start = self.count % self.capacity
+        return np.concatenate([self.buffer[start:], self.buffer[:start]])
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+# read a journal file as a numpy array of records (memory-mapped, nothing is copied)
+# safe to call while the bot is writing to it: only whole records are included
+# provide: path of the journal file
+# returns: numpy record array with the fields in record_dtype (empty if the file is empty or missing)
+def read_journal(path):
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=record_dtype)
+    records = os.path.getsize(path) // record_dtype.itemsize
+    if records == 0:
+        return np.zeros(0, dtype=record_dtype)
+    return np.memmap(path, dtype=record_dtype, mode='r', shape=(records,))
+
+
+# price checks for one stock from a journal as a dataframe-friendly pair of arrays
+# provide: records from read_journal and the target_stock
+# returns: list of times (seconds since epoch) and prices
+def journal_prices(records, target_stock):
+    checks = records[(records['symbol'] == target_stock.encode()) & (records['decision'] <= decisions['sell'])]
+    return [checks['time'], checks['price']]
@@ -0,0 +1,292 @@
+# This file holds the shared buy/sell logic used by the tests in testing.py, written against numpy arrays
+# Signals are worked out for every bar at once as true/false masks, then the buy -> sell -> buy alternation is
+# resolved by jumping straight from one signal to the next instead of walking the data row by row
+
+import numpy as np
+
+
+# mark every bar where price rose or dropped compared to the bar before it (the first bar is neither)
+# works on one stock's prices or on a 2D array with one stock per row (compared along each row)
+# provide: prices - numpy array of prices (e.g. the 'Average' column)
+# returns: list with the rise mask and the drop mask
+def rise_drop(prices):
+    rise = np.zeros(prices.shape, dtype=bool)
+    drop = np.zeros(prices.shape, dtype=bool)
+    rise[..., 1:] = prices[..., :-1] < prices[..., 1:]
+    drop[..., 1:] = prices[..., :-1] > prices[..., 1:]
+    return [rise, drop]
+
+
+# buy/sell signals for the primary approach (robinhood.py)
+# buy when price is at or below the buy price and has started to rise, sell when price is at or above the sell
+# price and has started to drop
+# for a 2D array of prices (one stock per row), buy_price and sell_price can be columns of per-stock prices
+# provide: prices - numpy array of prices, buy_price and sell_price - target prices
+# returns: list with the buy signal mask and the sell signal mask
+def target_signals(prices, buy_price, sell_price):
+    rise, drop = rise_drop(prices)
+    buy = rise & (prices <= buy_price) & (prices > 0)
+    sell = drop & (prices >= sell_price) & (prices > 0)
+    return [buy, sell]
+
+
+# buy/sell signals for the alternate approach (alternate_approach.py)
+# buy at every dip (price rises right after dropping), sell at every peak (price drops right after rising)
+# works on one stock's prices or on a 2D array with one stock per row (compared along each row)
+# provide: prices - numpy array of prices
+# returns: list with the buy signal mask and the sell signal mask
+def dip_peak_signals(prices):
+    rise, drop = rise_drop(prices)
+    buy = np.zeros(prices.shape, dtype=bool)
+    sell = np.zeros(prices.shape, dtype=bool)
+    buy[..., 1:] = rise[..., 1:] & drop[..., :-1]
+    sell[..., 1:] = drop[..., 1:] & rise[..., :-1]
+    return [buy & (prices > 0), sell & (prices > 0)]
+
+
+# resolve buy/sell signals into actual trades, alternating buy then sell then buy...
+# only the first signal of each run of same-type signals can be acted on (we never buy twice in a row), so the
+# trades are the signals where the type changes, with any sells before the first buy dropped
+# provide: buy and sell signal masks, holding (true if stock is already held going in, so a sell comes first)
+# returns: list with the bar positions of each buy and each sell
+def alternate_trades(buy, sell, holding=False):
+    events = np.flatnonzero(buy | sell)
+    is_buy = buy[events]
+    keep = np.empty(len(events), dtype=bool)
+    if len(events) > 0:
+        keep[0] = is_buy[0] != holding
+        keep[1:] = is_buy[1:] != is_buy[:-1]
+    return [events[keep & is_buy], events[keep & ~is_buy]]
+
+
+# first sell signal (from position 'start' in the list of sell signals) where price is above a given price
+# searches ahead in growing steps so the whole scan stays linear in the number of signals
+# returns: bar position of the sell, or None if price never gets above it
+def first_sell_above(sell_positions, start, prices, price):
+    step = 16
+    while start < len(sell_positions):
+        candidates = sell_positions[start:start + step]
+        above = np.flatnonzero(prices[candidates] > price)
+        if len(above) > 0:
+            return candidates[above[0]]
+        start = start + step
+        step = step * 2
+    return None
+
+
+# same as alternate_trades, but a sell only counts if price is above what we bought at (alternate approach)
+# jumps from each buy to the first sell signal above the buy price
+# provide: buy and sell signal masks, prices - numpy array of prices, holding_price (what we paid if stock is already
+#           held going in, so the first trade is a sell above it)
+# returns: list with the bar positions of each buy and each sell
+def profitable_trades(buy, sell, prices, holding_price=None):
+    buy_positions = np.flatnonzero(buy)
+    sell_positions = np.flatnonzero(sell)
+    buys = list()
+    sells = list()
+    position = 0
+    if holding_price is not None:
+        sold_at = first_sell_above(sell_positions, 0, prices, holding_price)
+        if sold_at is None:
+            return [np.array(buys, dtype=np.int64), np.array(sells, dtype=np.int64)]
+        sells.append(sold_at)
+        position = sold_at + 1
+    while True:
+        next_buy = np.searchsorted(buy_positions, position)
+        if next_buy == len(buy_positions):
+            break
+        bought_at = buy_positions[next_buy]
+        buys.append(bought_at)
+
+        next_sell = np.searchsorted(sell_positions, bought_at, side='right')
+        sold_at = first_sell_above(sell_positions, next_sell, prices, prices[bought_at])
+        if sold_at is None:
+            break
+        sells.append(sold_at)
+        position = sold_at + 1
+    return [np.array(buys, dtype=np.int64), np.array(sells, dtype=np.int64)]
+
+
+# turn trade positions into the record of buy and sell prices
+# if we are still holding at the end of the day, sell at the end of day price as long as it's for any profit
+# provide: prices - numpy array of prices, buy and sell positions from alternate_trades/profitable_trades
+# returns: list with the buy prices and the sell prices
+def trade_record(prices, buys, sells):
+    buy_prices = prices[buys]
+    sell_prices = prices[sells]
+    if len(buy_prices) > len(sell_prices):
+        close_price = prices[-1]
+        if buy_prices[-1] < close_price:
+            sell_prices = np.append(sell_prices, close_price)
+    return [buy_prices, sell_prices]
+
+
+# figure out buy/sell/profit data from the record of buy and sell prices
+# each buy spends the same amount, each sell sells whatever the last buy picked up
+# sums are running (cumulative) sums so totals come out exactly the same as adding them up one by one
+# provide: buy_prices and sell_prices from trade_record, spend - dollar amount of each purchase
+# returns: bought, sold, count (count of full buy/sell transactions), profit, holding (stock remaining)
+def summarize_trades(buy_prices, sell_prices, spend):
+    if len(buy_prices) == 0:
+        return [0, 0, 0, 0, 0]
+
+    count = len(sell_prices)
+    bought = float(np.cumsum(np.full(len(buy_prices), spend, dtype=np.float64))[-1])
+    percent_holding = spend / buy_prices
+    if count > 0:
+        sold = float(np.cumsum(percent_holding[:count] * sell_prices)[-1])
+    else:
+        sold = 0
+
+    profit = sold - bought
+    if (count * spend) < bought:
+        holding = float(percent_holding[-1])
+        profit = profit + spend
+    else:
+        holding = 0
+    return [bought, sold, count, profit, holding]
+
+
+# run the primary approach over one day of prices
+# provide: prices - numpy array of prices, buy_price and sell_price - target prices, spend - amount per purchase
+# returns: bought, sold, count, profit, holding (see summarize_trades)
+def run_target_strategy(prices, buy_price, sell_price, spend):
+    buy, sell = target_signals(prices, buy_price, sell_price)
+    buys, sells = alternate_trades(buy, sell)
+    buy_prices, sell_prices = trade_record(prices, buys, sells)
+    return summarize_trades(buy_prices, sell_prices, spend)
+
+
+# run the alternate approach over one day of prices
+# provide: prices - numpy array of prices, spend - amount per purchase
+# returns: bought, sold, count, profit, holding (see summarize_trades)
+def run_dip_strategy(prices, spend):
+    buy, sell = dip_peak_signals(prices)
+    buys, sells = profitable_trades(buy, sell, prices)
+    buy_prices, sell_prices = trade_record(prices, buys, sells)
+    return summarize_trades(buy_prices, sell_prices, spend)
+
+
+# same as alternate_trades, for a 2D array of signals with one stock per row (each row alternates on its own)
+# returns: list with the (row, bar) positions of each buy and each sell
+def alternate_trades_by_row(buy, sell):
+    rows, events = np.nonzero(buy | sell)
+    is_buy = buy[rows, events]
+    keep = np.empty(len(events), dtype=bool)
+    if len(events) > 0:
+        new_row = np.ones(len(events), dtype=bool)
+        new_row[1:] = rows[1:] != rows[:-1]
+        keep[0] = is_buy[0]
+        keep[1:] = is_buy[1:] != is_buy[:-1]
+        keep = np.where(new_row, is_buy, keep)
+    buys = keep & is_buy
+    sells = keep & ~is_buy
+    return [[rows[buys], events[buys]], [rows[sells], events[sells]]]
+
+
+# same as trade_record and summarize_trades together, for every row of a 2D array of prices at once
+# each sell is paired with the buy right before it in its row, the end of day close-out uses each row's last price
+# provide: prices - 2D numpy array of prices (one stock per row), buy and sell positions from
+#           alternate_trades_by_row, spend - amount per purchase, close_prices (defaults to each row's last price)
+# returns: list of arrays (one value per row) of bought, sold, count, profit, holding (see summarize_trades)
+def summarize_trades_by_row(prices, buys, sells, spend, close_prices=None):
+    row_count = prices.shape[0]
+    if close_prices is None:
+        close_prices = prices[:, -1]
+    buy_rows, buy_bars = buys
+    sell_rows, sell_bars = sells
+    buy_prices = prices[buy_rows, buy_bars]
+    percent_holding = spend / buy_prices
+    buy_count = np.bincount(buy_rows, minlength=row_count)
+    count = np.bincount(sell_rows, minlength=row_count)
+
+    # the k-th sell in a row goes with the k-th buy in that row
+    first_buy = np.concatenate([[0], np.cumsum(buy_count)[:-1]])
+    first_sell = np.concatenate([[0], np.cumsum(count)[:-1]])
+    paired = first_buy[sell_rows] + np.arange(len(sell_rows)) - first_sell[sell_rows]
+    proceeds = percent_holding[paired] * prices[sell_rows, sell_bars]
+
+    # still holding at the end of the day: sell at the close if it's for any profit
+    holding_rows = np.flatnonzero(buy_count > count)
+    last_buy = first_buy[holding_rows] + buy_count[holding_rows] - 1
+    closed_out = buy_prices[last_buy] < close_prices[holding_rows]
+    close_rows = holding_rows[closed_out]
+    close_proceeds = percent_holding[last_buy[closed_out]] * close_prices[close_rows]
+
+    # add the sells up in the same order as summarize_trades (each row's close-out comes after its other sells)
+    sale_rows = np.concatenate([sell_rows, close_rows])
+    order = np.argsort(sale_rows * 2 + np.concatenate([np.zeros(len(sell_rows), dtype=np.int64),
+                                                       np.ones(len(close_rows), dtype=np.int64)]), kind='stable')
+    sold = np.bincount(sale_rows[order], np.concatenate([proceeds, close_proceeds])[order], minlength=row_count)
+    bought = np.bincount(buy_rows, np.full(len(buy_rows), spend, dtype=np.float64), minlength=row_count)
+    count = count + np.bincount(close_rows, minlength=row_count)
+
+    profit = sold - bought
+    holding = np.zeros(row_count)
+    still_holding = count * spend < bought
+    holding[still_holding] = percent_holding[first_buy[still_holding] + buy_count[still_holding] - 1]
+    profit[still_holding] = profit[still_holding] + spend
+    return [bought, sold, count, profit, holding]
+
+
+# run the primary approach over one day of prices for many stocks at once
+# provide: prices - 2D numpy array of prices (one stock per row), buy_prices and sell_prices - arrays of target prices
+#           (one per row), spend - amount per purchase, close_prices (see summarize_trades_by_row)
+# returns: list of arrays (one value per row) of bought, sold, count, profit, holding (see summarize_trades)
+def run_target_strategy_by_row(prices, buy_prices, sell_prices, spend, close_prices=None):
+    buy, sell = target_signals(prices, np.asarray(buy_prices)[:, None], np.asarray(sell_prices)[:, None])
+    buys, sells = alternate_trades_by_row(buy, sell)
+    return summarize_trades_by_row(prices, buys, sells, spend, close_prices)
+
+
+# same as profitable_trades, for a 2D array of signals with one stock (or price path) per row
+# every row takes its next buy, then jumps to its first sell above that buy price, all rows together, until no row
+# has another trade to make
+# returns: list with the (row, bar) positions of each buy and each sell
+def profitable_trades_by_row(buy, sell, prices):
+    row_count, bar_count = buy.shape
+    columns = np.arange(bar_count)
+
+    # position of the next buy signal at or after each bar (bar_count if there isn't one, including past the end)
+    next_buy = np.minimum.accumulate(np.where(buy, columns, bar_count)[:, ::-1], axis=1)[:, ::-1]
+    next_buy = np.concatenate([next_buy, np.full((row_count, 1), bar_count)], axis=1)
+
+    rows = np.arange(row_count)
+    position = np.zeros(row_count, dtype=np.int64)
+    buys = [[], []]
+    sells = [[], []]
+    while len(rows) > 0:
+        bought_at = next_buy[rows, position]
+        found = bought_at < bar_count
+        rows = rows[found]
+        bought_at = bought_at[found]
+        buys[0].append(rows)
+        buys[1].append(bought_at)
+
+        above = sell[rows] & (prices[rows] > prices[rows, bought_at][:, None]) & (columns > bought_at[:, None])
+        sold_at = above.argmax(axis=1)
+        found = above[np.arange(len(rows)), sold_at]
+        rows = rows[found]
+        sold_at = sold_at[found]
+        sells[0].append(rows)
+        sells[1].append(sold_at)
+        position = sold_at + 1
+
+    # put the trades back in row then bar order (what summarize_trades_by_row expects)
+    trades = list()
+    for trade_rows, trade_bars in (buys, sells):
+        trade_rows = np.concatenate(trade_rows + [np.empty(0, dtype=np.int64)])
+        trade_bars = np.concatenate(trade_bars + [np.empty(0, dtype=np.int64)])
+        order = np.lexsort((trade_bars, trade_rows))
+        trades.append([trade_rows[order], trade_bars[order]])
+    return trades
+
+
+# run the alternate approach over one day of prices for many stocks (or price paths) at once
+# provide: prices - 2D numpy array of prices (one stock per row), spend - amount per purchase, close_prices (see
+#           summarize_trades_by_row)
+# returns: list of arrays (one value per row) of bought, sold, count, profit, holding (see summarize_trades)
+def run_dip_strategy_by_row(prices, spend, close_prices=None):
+    buy, sell = dip_peak_signals(prices)
+    buys, sells = profitable_trades_by_row(buy, sell, prices)
+    return summarize_trades_by_row(prices, buys, sells, spend, close_prices)
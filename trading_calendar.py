@@ -0,0 +1,181 @@
+# This file knows which days the stock market (NYSE/Nasdaq) is open and which days it closes early
+# Every trading day (session) from first_day to last_day is worked out once when the file is loaded, so checking a
+# day, stepping back a number of sessions or listing the sessions in a range is a lookup instead of a loop over
+# calendar days.  Weekends, market holidays and one-off closures are all skipped, so nothing downloads or tests a day
+# the market was closed.
+
+from datetime import date, datetime, time, timedelta
+import numpy as np
+
+# span of days the calendar covers
+first_day = date(1990, 1, 1)
+last_day = date(2099, 12, 31)
+
+# regular and early (half day) closing time, exchange time
+regular_close = time(16, 0)
+early_close = time(13, 0)
+
+# days the market closed outside of the regular holidays (national days of mourning, weather, etc.)
+# add to this if the exchange announces a new closure
+special_closures = [date(1994, 4, 27), date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+                    date(2004, 6, 11), date(2007, 1, 2), date(2012, 10, 29), date(2012, 10, 30), date(2018, 12, 5),
+                    date(2025, 1, 9)]
+
+
+# nth given weekday (0 = Monday) of a month, or the last one if n is -1
+def nth_weekday(year, month, weekday, n):
+    if n == -1:
+        day = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return day - timedelta(days=(day.weekday() - weekday) % 7)
+    day = date(year, month, 1)
+    return day + timedelta(days=(weekday - day.weekday()) % 7 + 7 * (n - 1))
+
+
+# Easter Sunday (Gregorian calendar), Good Friday is two days before it
+def easter(year):
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+# holidays on a fixed date move to Friday if they fall on a Saturday and to Monday if they fall on a Sunday
+def observed(day):
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+# market holidays for a year
+def holidays(year):
+    days = [nth_weekday(year, 2, 0, 3),                  # Presidents' Day
+            easter(year) - timedelta(days=2),            # Good Friday
+            nth_weekday(year, 5, 0, -1),                 # Memorial Day
+            observed(date(year, 7, 4)),                  # Independence Day
+            nth_weekday(year, 9, 0, 1),                  # Labor Day
+            nth_weekday(year, 11, 3, 4),                 # Thanksgiving
+            observed(date(year, 12, 25))]                # Christmas
+    # New Year's Day on a Saturday isn't made up on the Friday before (that Friday is the last day of the year)
+    if date(year, 1, 1).weekday() != 5:
+        days.append(observed(date(year, 1, 1)))
+    if year >= 1998:
+        days.append(nth_weekday(year, 1, 0, 3))          # Martin Luther King Jr. Day
+    if year >= 2022:
+        days.append(observed(date(year, 6, 19)))         # Juneteenth
+    return days
+
+
+# days the market closes early (1pm): the day before Independence Day, the day after Thanksgiving and Christmas Eve
+def half_days(year):
+    days = [nth_weekday(year, 11, 3, 4) + timedelta(days=1)]
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() < 4:
+            days.append(day)
+    return days
+
+
+# PRECOMPUTED INDEX
+# =================================================================================================================
+# every calendar day in the span, and whether the market is open that day
+all_days = np.arange(np.datetime64(first_day), np.datetime64(last_day + timedelta(days=1)))
+closed_days = [day for year in range(first_day.year, last_day.year + 1) for day in holidays(year)] + special_closures
+is_open = (((all_days.astype(np.int64) + 3) % 7) < 5) & ~np.isin(all_days, np.array(closed_days, dtype='datetime64[D]'))
+is_half_day = np.isin(all_days, np.array([day for year in range(first_day.year, last_day.year + 1)
+                                          for day in half_days(year)], dtype='datetime64[D]')) & is_open
+
+# the sessions in order, and for every calendar day the position of the first session on or after it
+sessions = all_days[is_open]
+next_session = np.cumsum(is_open) - is_open
+
+
+# position of a day in all_days (datetime and pandas Timestamp are accepted too)
+def day_offset(day):
+    if isinstance(day, datetime):
+        day = day.date()
+    offset = (day - first_day).days
+    if offset < 0 or offset >= len(all_days):
+        raise ValueError(f'{day} is outside the trading calendar ({first_day} to {last_day})')
+    return offset
+
+
+def session_date(index):
+    return sessions[index].astype(date)
+
+
+# position of the session 'count' sessions before the session at 'index' (the first session on or after 'day')
+# raises ValueError if that's before the first session in the calendar, instead of wrapping round to the end of it
+def index_before(index, count, day):
+    if index - count < 0:
+        raise ValueError(f'there are fewer than {count} sessions before {day} in the trading calendar '
+                         f'(starts {first_day})')
+    return index - count
+
+
+# LOOKUPS
+# =================================================================================================================
+# whether the market is open on a day
+def is_session(day):
+    return bool(is_open[day_offset(day)])
+
+
+# whether the market closes early (1pm) on a day
+def is_early_close(day):
+    return bool(is_half_day[day_offset(day)])
+
+
+# closing time (exchange time) on a day the market is open
+def close_time(day):
+    return early_close if is_early_close(day) else regular_close
+
+
+# first session on or after a day (the day itself if the market is open)
+def session_on_or_after(day):
+    return session_date(next_session[day_offset(day)])
+
+
+# the session 'count' sessions before a day (count=1 is the last session before it)
+def session_before(day, count=1):
+    return session_date(index_before(next_session[day_offset(day)], count, day))
+
+
+# every session from start_date up to but not including end_date
+def sessions_between(start_date, end_date):
+    start = next_session[day_offset(start_date)]
+    end = next_session[day_offset(end_date)]
+    return list(sessions[start:end].astype(date))
+
+
+# date range holding the 'count' sessions before a day, as start date and end date (end date is exclusive, same as
+# prep_data), so the whole window is pulled in one request
+def history_window(day, count=5):
+    index = next_session[day_offset(day)]
+    return [session_date(index_before(index, count, day)), session_date(index - 1) + timedelta(days=1)]
+
+
+# date range holding 'count' sessions starting from a day (or the next session if the market is closed that day)
+def test_window(day, count=5):
+    index = next_session[day_offset(day)]
+    return [session_date(index), session_date(index + count - 1) + timedelta(days=1)]
+
+
+# history windows for every session in a date range at once
+# provide: start_date and end_date (end date is exclusive) and count (sessions of history for each day)
+# returns: list of [test day, history start date, history end date (exclusive)] for each session in the range
+#           (ValueError if the range starts less than 'count' sessions into the calendar, see index_before)
+def session_windows(start_date, end_date, count=5):
+    start = next_session[day_offset(start_date)]
+    end = next_session[day_offset(end_date)]
+    index_before(start, count, start_date)
+    indexes = np.arange(start, end)
+    days = sessions[indexes].astype(date)
+    hist_starts = sessions[indexes - count].astype(date)
+    hist_ends = (sessions[indexes - 1] + np.timedelta64(1, 'D')).astype(date)
+    return [[day, hist_start, hist_end] for day, hist_start, hist_end in zip(days, hist_starts, hist_ends)]
@@ -0,0 +1,156 @@
+# This file holds the per-stock buy/sell decision logic used by the live trading code
+# It is the same logic as robinhood.py (the 'target' approach) and alternate_approach.py (the 'dip' approach),
+# kept as a dictionary of state per stock so many stocks can be traded side by side
+
+# TARGET APPROACH (robinhood.py) - buy below the buy price at the first sign of a rise, sell above the sell price
+# at the first sign of a drop
+# DIP APPROACH (alternate_approach.py) - buy at every dip, sell at every peak as long as it's above what we paid
+strategies = ('target', 'dip')
+
+
+# set up the state tracked for one stock
+# provide: target_stock (ticker e.g. 'MSFT'), spend (dollar amount of each purchase), strategy ('target' or 'dip'),
+#           buy_price and sell_price (target prices, only used by the 'target' approach)
+#           stats and std_use (optional, RollingStats from rolling_stats.py - if provided, buy/sell prices are
+#           recalculated from every new price as std_use standard deviations below/above the rolling average)
+# returns: dictionary holding the stock's settings, current action (buy or sell) and running totals
+def new_position(target_stock, spend, strategy='target', buy_price=0, sell_price=0, stats=None, std_use=1):
+    if strategy not in strategies:
+        raise ValueError(f'Unknown strategy {strategy}, use one of {strategies}')
+    if stats is not None:
+        buy_price, sell_price = stats.thresholds(std_use)
+    return {'symbol': target_stock,
+            'strategy': strategy,
+            'spend': spend,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'stats': stats,
+            'std_use': std_use,
+            'action': 'buy',
+            'active': True,
+            'last_price': None,
+            'stock_amount': 0,
+            'cost': 0,
+            'pending': False,
+            'target_price': 0,
+            'bought': 0,
+            'sold': 0,
+            'profit': 0,
+            'transactions': 0}
+
+
+# compare current price to last known price to see if it's rising/falling
+def price_path(last_price, current_price):
+    if current_price < last_price:
+        return 'drop'
+    elif current_price > last_price:
+        return 'rise'
+    return 'hold'
+
+
+# decide what to do with a stock given its latest price
+# if the stock follows a rolling average, the price is added to it and buy/sell prices are updated first
+# the first price seen for a stock is only remembered (we need two prices to know if it's rising or falling)
+# provide: position from new_position, current_price - latest price of the stock
+# returns: 'buy', 'sell' or None
+def decide(position, current_price):
+    if position['stats'] is not None:
+        position['stats'].push(current_price)
+        position['buy_price'], position['sell_price'] = position['stats'].thresholds(position['std_use'])
+
+    # no new decisions while an order for this stock is still being worked on
+    last_price = position['last_price']
+    position['last_price'] = current_price
+    if last_price is None or not position['active'] or position['pending']:
+        return None
+    path = price_path(last_price, current_price)
+
+    # trigger a buy if we are trying to buy and price has turned to rise (below our buy price for the target approach)
+    if position['action'] == 'buy' and path == 'rise':
+        if position['strategy'] == 'dip' or current_price < position['buy_price']:
+            return 'buy'
+
+    # trigger a sell if we are trying to sell and price has turned to fall
+    # target approach sells above the sell price, dip approach sells above what we bought at
+    if position['action'] == 'sell' and path == 'drop':
+        if position['strategy'] == 'target' and current_price > position['sell_price']:
+            return 'sell'
+        if position['strategy'] == 'dip' and current_price > position['target_price']:
+            return 'sell'
+    return None
+
+
+# update the stock's state after deciding to buy at a given price
+# totals assume the order fills at that price until apply_buy_fill corrects them with the real fill
+# returns: the amount of stock to order
+def record_buy(position, price):
+    position['action'] = 'sell'
+    position['stock_amount'] = round(position['spend'] / price, 6)
+    position['target_price'] = price
+    position['bought'] = position['bought'] + position['spend']
+    position['cost'] = position['spend']
+    return position['stock_amount']
+
+
+# update the stock's state after deciding to sell at a given price
+# totals assume the order fills at that price until apply_sell_fill corrects them with the real fill
+# returns: the amount of stock to order
+def record_sell(position, price):
+    position['action'] = 'buy'
+    position['transactions'] = position['transactions'] + 1
+    proceeds = position['stock_amount'] * price
+    position['sold'] = position['sold'] + proceeds
+    position['profit'] = position['profit'] + proceeds - position['cost']
+    return position['stock_amount']
+
+
+# correct the stock's state once we know how a buy order actually filled
+# nothing filled (rejected/cancelled) - go back to looking to buy as if the buy never happened
+# otherwise - hold what actually filled, at what we actually paid (the dip approach sells above the real fill price)
+# provide: position, quantity ordered, filled quantity and average fill price
+def apply_buy_fill(position, quantity, filled, fill_price):
+    if filled <= 0 or fill_price is None:
+        position['action'] = 'buy'
+        position['bought'] = position['bought'] - position['spend']
+        position['stock_amount'] = 0
+        position['cost'] = 0
+        return
+    paid = filled * fill_price
+    position['bought'] = position['bought'] - position['spend'] + paid
+    position['stock_amount'] = filled
+    position['cost'] = paid
+    position['target_price'] = fill_price
+
+
+# correct the stock's state once we know how a sell order actually filled
+# nothing filled (rejected/cancelled) - go back to looking to sell, still holding the stock
+# part filled - count what sold (at its share of what we paid) and keep looking to sell the rest
+# provide: position, quantity ordered, price the sell was decided at, filled quantity and average fill price
+def apply_sell_fill(position, quantity, price, filled, fill_price):
+    expected = quantity * price
+    expected_profit = expected - position['cost']
+    position['sold'] = position['sold'] - expected
+    position['profit'] = position['profit'] - expected_profit
+    if filled <= 0 or fill_price is None:
+        position['action'] = 'sell'
+        position['transactions'] = position['transactions'] - 1
+        return
+    proceeds = filled * fill_price
+    cost_sold = position['cost'] * min(filled / quantity, 1)
+    position['sold'] = position['sold'] + proceeds
+    position['profit'] = position['profit'] + proceeds - cost_sold
+    if filled < quantity:
+        position['action'] = 'sell'
+        position['stock_amount'] = round(quantity - filled, 6)
+        position['cost'] = position['cost'] - cost_sold
+    else:
+        position['cost'] = 0
+
+
+# summary report at the end of the day (same report the single stock scripts print)
+def print_summary(position):
+    stock_left = position['stock_amount'] if position['action'] == 'sell' else 0
+    print(f'Target Stock {position["symbol"]} Daily Summary')
+    print(f'Total purchase amount: ${position["bought"]}')
+    print(f'Total sell amount: ${position["sold"]}')
+    print(f'Resultant profit: ${position["profit"]} with {stock_left} stocks left over.')
@@ -0,0 +1,94 @@
+# This file runs the primary approach test (full_check in testing.py) over a whole span of days in one pass
+# test_x_days calls full_check for every day, which pulls that day's 5 day history window and works out its average
+# and standard deviation from scratch.  Here the whole span is loaded once, every day's buy/sell prices come from
+# running (cumulative) sums over its history window, and all of the test days are run through the buy/sell logic
+# together (one row per day).  Results are the same as full_check day by day.
+
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import bar_cache
+from trade_kernel import run_target_strategy_by_row
+from trading_calendar import session_windows
+
+# columns of the per-day results returned by walk_forward
+walk_forward_columns = ['date', 'buy_price', 'sell_price', 'bought', 'sold', 'count', 'profit', 'holding']
+
+
+# time each day starts on the exchange's calendar, in seconds since epoch (the same clock the bar store uses)
+def day_starts(days):
+    return pd.DatetimeIndex(pd.to_datetime(days)).tz_localize(bar_cache.market_timezone).as_unit('s').asi8
+
+
+# buy/sell prices for many windows of one price array at once, from running sums of price and price squared
+# prices are measured from the first price before summing so the squares stay small and the sums stay accurate
+# missing prices (nan) are left out of the sums and the counts, the same as pandas mean/std skip them
+# provide: prices, starts and ends (bar positions of each window, end is exclusive), std_use
+# returns: list of arrays of buy prices and sell prices, one per window (nan if a window has fewer than two prices)
+def rolling_thresholds(prices, starts, ends, std_use):
+    valid = np.isfinite(prices)
+    shift = prices[valid][0] if valid.any() else 0
+    shifted = np.where(valid, prices - shift, 0)
+    sums = np.concatenate([[0], np.cumsum(shifted)])
+    squares = np.concatenate([[0], np.cumsum(shifted * shifted)])
+    valid_counts = np.concatenate([[0], np.cumsum(valid)])
+    counts = valid_counts[ends] - valid_counts[starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[ends] - sums[starts]) / counts
+        variance = (squares[ends] - squares[starts] - counts * mean * mean) / (counts - 1)
+        standard_deviation = np.sqrt(np.maximum(variance, 0)) * std_use
+    standard_deviation[counts < 2] = np.nan
+    return [shift + mean - standard_deviation, shift + mean + standard_deviation]
+
+
+# test every trading day in a date range with the primary approach, loading the data once
+# each day's buy/sell prices come from the 5 trading days before it (same as recommend_points)
+# provide: target_stock (ticker e.g. 'MSFT'), std_use, spend, start_date and end_date (test days run from
+#           start_date up to but not including end_date) and the bar interval
+# returns: list with a dataframe of per-day results (see walk_forward_columns) and the totals over every day
+#           (bought, sold, count, profit, holding - same as adding up full_check for each day)
+def walk_forward(target_stock, std_use, spend, start_date, end_date, interval='5m'):
+    windows = session_windows(start_date, end_date)
+    if len(windows) == 0:
+        return [pd.DataFrame(columns=walk_forward_columns), [0, 0, 0, 0, 0]]
+    days = [window[0] for window in windows]
+    arrays = bar_cache.load_arrays(target_stock, windows[0][1], days[-1] + timedelta(days=1), interval)
+    times = arrays[0]
+    prices = (arrays[1] + arrays[2]) / 2
+
+    # bar positions of each day's history window and test day
+    hist_starts = np.searchsorted(times, day_starts([window[1] for window in windows]))
+    hist_ends = np.searchsorted(times, day_starts([window[2] for window in windows]))
+    test_starts = np.searchsorted(times, day_starts(days))
+    test_ends = np.searchsorted(times, day_starts([day + timedelta(days=1) for day in days]))
+    buy_prices, sell_prices = rolling_thresholds(prices, hist_starts, hist_ends, std_use)
+
+    # one row per test day, shorter days padded with nan at the end (nan never triggers a buy or sell)
+    lengths = test_ends - test_starts
+    matrix = np.full((len(days), max(lengths.max(), 1)), np.nan)
+    columns = np.arange(matrix.shape[1])
+    filled = columns[None, :] < lengths[:, None]
+    matrix[filled] = prices[(test_starts[:, None] + columns[None, :])[filled]]
+    close_prices = prices[np.maximum(test_ends - 1, 0)] if len(prices) > 0 else np.full(len(days), np.nan)
+
+    info = run_target_strategy_by_row(matrix, buy_prices, sell_prices, spend, close_prices)
+    daily = pd.DataFrame({'date': days, 'buy_price': buy_prices, 'sell_price': sell_prices, 'bought': info[0],
+                          'sold': info[1], 'count': info[2], 'profit': info[3], 'holding': info[4]},
+                         columns=walk_forward_columns)
+    # running sums, so totals add up day by day in the same order as test_x_days
+    totals = [float(np.cumsum(values)[-1]) for values in info]
+    totals[2] = int(totals[2])
+    return [daily, totals]
+
+
+# same report as test_x_days in testing.py, using walk_forward
+# analyze the target stock for the past 'x' days and print the totals bought/sold/transactions/profit/stock remaining
+# end_date moves the 'x' days to the days before a different date than today
+def test_x_days_walk_forward(target_stock, std_use, max_spend, day_count, end_date=None):
+    end_date = end_date or date.today()
+    daily, totals = walk_forward(target_stock, std_use, max_spend, end_date - timedelta(days=day_count), end_date)
+    bought, sold, count, profit, holding = totals
+    print(f'Analysis of {target_stock} over the last {day_count} days:')
+    print(f'Bought ${round(bought, 4)} in total, sold ${round(sold, 4)} in total, for {count} complete buy/sell transactions.')
+    print(f'Total profit was ${round(profit, 4)} with {round(holding, 5)} shares still in holding')
+    return daily